@@ -14,90 +14,239 @@ import sys
 import json
 from pathlib import Path
 from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Any, Dict, Final, Iterable, Iterator, List
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+# ijson streams the dataset (picking its C yajl2 backend when installed);
+# fall back to a full json.load when it isn't available.
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
-def load_dataset(path: Path):
-    """Load the catastrophe dataset."""
+# orjson parses the whole file much faster than the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Map root causes to required invariants (tuples: immutable, cheap to iterate)
+invariant_map: Final = {
+    'buffer_over_read': ('bounds_checked', 'input_length_validated'),
+    'buffer_overflow': ('bounds_checked', 'input_length_validated'),
+    'heap_buffer_overflow': ('bounds_checked', 'malloc_checked'),
+    'out_of_bounds_read': ('bounds_checked',),
+    'out_of_bounds_write': ('bounds_checked',),
+    
+    'race_condition': ('mutex_protected', 'atomic_operation', 'critical_section'),
+    
+    'unsafe_deserialization': ('deserialization_safe', 'type_validated'),
+    'injection': ('input_sanitized', 'parameterized_query'),
+    'sql_injection': ('parameterized_query', 'input_sanitized'),
+    
+    'integer_overflow': ('overflow_checked', 'safe_arithmetic'),
+    'floating_point_accumulation': ('precision_aware',),
+    
+    'uninitialized_memory': ('initialized_before_use',),
+    'certificate_validation_bypass': ('certificate_validated',),
+    'authorization_bypass': ('authorized',),
+    
+    'prototype_pollution': ('prototype_frozen', 'property_validated'),
+    'class_loader_manipulation': ('classloader_restricted',),
+    
+    'supply_chain_attack': ('dependency_verified', 'checksum_validated'),
+    'dependency_removal': ('dependency_exists',),
+    
+    'logic_error': ('state_machine_valid', 'invariant_maintained'),
+    'unit_conversion_error': ('units_consistent',),
+    'parsing_vulnerability': ('parser_bounded', 'input_validated'),
+    
+    'regex_denial_of_service': ('regex_bounded', 'timeout_set'),
+    'speculative_execution': ('speculation_barrier',),
+    'deployment_error': ('configuration_validated',),
+}
+_UNKNOWN: Final = ('unknown',)
+
+# Report rules and the 100% bar (one block per 2%), built once
+BANNER: Final = "=" * 70
+RULE: Final = "-" * 70
+_FULL_BAR: Final = "█" * 50
+
+# Invariants the detector already checks
+current_invariants: Final = frozenset({
+    'bounds_checked',
+    'null_checked',
+    'authenticated',
+    'authorized',
+    'encrypted',
+    'rate_limited',
+    'audit_logged',
+})
+
+# Missing invariants grouped for the report
+categories: Final = {
+    'Memory Safety': (
+        'input_length_validated', 'malloc_checked', 'initialized_before_use',
+        'overflow_checked', 'safe_arithmetic'
+    ),
+    'Concurrency': (
+        'mutex_protected', 'atomic_operation', 'critical_section',
+    ),
+    'Input Validation': (
+        'input_sanitized', 'parameterized_query', 'deserialization_safe',
+        'type_validated', 'parser_bounded', 'input_validated'
+    ),
+    'State Management': (
+        'state_machine_valid', 'invariant_maintained', 'prototype_frozen',
+        'property_validated'
+    ),
+    'Security': (
+        'certificate_validated', 'dependency_verified', 'checksum_validated',
+        'classloader_restricted'
+    ),
+    'Resource Management': (
+        'regex_bounded', 'timeout_set', 'speculation_barrier',
+    ),
+    'Configuration': (
+        'units_consistent', 'configuration_validated', 'dependency_exists',
+        'precision_aware'
+    ),
+}
+
+# Detector build order, highest first, ranked by:
+# 1. Frequency in dataset
+# 2. Severity (death-causing vs. financial)
+# 3. Detectability (can we realistically detect it via AST?)
+priorities: Final = (
+    {
+        'name': 'Concurrency Safety',
+        'invariants': ('mutex_protected', 'atomic_operation', 'critical_section'),
+        'reason': 'Death-causing (Therac-25), hard to test, high impact',
+        'examples': ('Therac-25 race condition', 'Dirty COW race condition'),
+        'difficulty': 'Medium',
+    },
+    {
+        'name': 'Input Validation',
+        'invariants': ('input_sanitized', 'deserialization_safe', 'parameterized_query'),
+        'reason': 'Most common root cause (injection, deserialization)',
+        'examples': ('Log4Shell', 'Equifax Struts', 'Rails YAML'),
+        'difficulty': 'Medium',
+    },
+    {
+        'name': 'Integer Safety',
+        'invariants': ('overflow_checked', 'safe_arithmetic'),
+        'reason': 'Subtle, safety-critical (Ariane 5, Patriot missile)',
+        'examples': ('Ariane 5 overflow', 'Patriot missile timing'),
+        'difficulty': 'Easy',
+    },
+    {
+        'name': 'Memory Initialization',
+        'invariants': ('initialized_before_use',),
+        'reason': 'Common in C/C++ codebases',
+        'examples': ('Dirty Pipe', 'goto fail'),
+        'difficulty': 'Hard (requires data flow analysis)',
+    },
+    {
+        'name': 'State Machine Validation',
+        'invariants': ('state_machine_valid', 'invariant_maintained'),
+        'reason': 'Death-causing (737 MAX), complex systems',
+        'examples': ('Boeing 737 MAX MCAS', 'Kubernetes privilege escalation'),
+        'difficulty': 'Hard',
+    },
+    {
+        'name': 'Resource Bounds',
+        'invariants': ('regex_bounded', 'timeout_set', 'parser_bounded'),
+        'reason': 'DoS attacks, common in web services',
+        'examples': ('ua-parser ReDoS', 'XML bomb attacks'),
+        'difficulty': 'Easy',
+    },
+)
+
+
+def _load_json(path: Path) -> Any:
+    """Read a JSON file, via orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(path.read_bytes())
     with open(path) as f:
         return json.load(f)
 
 
-def analyze_root_causes(examples):
-    """Analyze root causes to identify needed invariants."""
-    
-    print("\n" + "=" * 70)
-    print("  ROOT CAUSE → INVARIANT MAPPING")
-    print("=" * 70)
-    
-    # Map root causes to required invariants
-    invariant_map = {
-        'buffer_over_read': ['bounds_checked', 'input_length_validated'],
-        'buffer_overflow': ['bounds_checked', 'input_length_validated'],
-        'heap_buffer_overflow': ['bounds_checked', 'malloc_checked'],
-        'out_of_bounds_read': ['bounds_checked'],
-        'out_of_bounds_write': ['bounds_checked'],
-        
-        'race_condition': ['mutex_protected', 'atomic_operation', 'critical_section'],
-        
-        'unsafe_deserialization': ['deserialization_safe', 'type_validated'],
-        'injection': ['input_sanitized', 'parameterized_query'],
-        'sql_injection': ['parameterized_query', 'input_sanitized'],
-        
-        'integer_overflow': ['overflow_checked', 'safe_arithmetic'],
-        'floating_point_accumulation': ['precision_aware'],
-        
-        'uninitialized_memory': ['initialized_before_use'],
-        'certificate_validation_bypass': ['certificate_validated'],
-        'authorization_bypass': ['authorized'],
-        
-        'prototype_pollution': ['prototype_frozen', 'property_validated'],
-        'class_loader_manipulation': ['classloader_restricted'],
-        
-        'supply_chain_attack': ['dependency_verified', 'checksum_validated'],
-        'dependency_removal': ['dependency_exists'],
-        
-        'logic_error': ['state_machine_valid', 'invariant_maintained'],
-        'unit_conversion_error': ['units_consistent'],
-        'parsing_vulnerability': ['parser_bounded', 'input_validated'],
-        
-        'regex_denial_of_service': ['regex_bounded', 'timeout_set'],
-        'speculative_execution': ['speculation_barrier'],
-        'deployment_error': ['configuration_validated'],
-    }
-    
-    # Count what invariants we need
-    needed_invariants = Counter()
-    root_causes = Counter()
-    
+def load_dataset(path: Path) -> Iterator[Dict]:
+    """Stream catastrophe examples from the dataset one at a time."""
+    if IJSON_AVAILABLE:
+        with open(path, 'rb') as f:
+            yield from ijson.items(f, 'examples.item', use_float=True)
+    else:
+        yield from _load_json(path).get('examples', [])
+
+
+@dataclass
+class DatasetStats:
+    """Aggregates for the whole report, gathered in one pass over the data."""
+    total: int = 0
+    deaths: int = 0
+    financial: int = 0
+    root_causes: Counter = field(default_factory=Counter)
+    needed_invariants: Counter = field(default_factory=Counter)
+    category_counts: Counter = field(default_factory=Counter)
+    by_category: Dict[str, List[Dict]] = field(default_factory=lambda: defaultdict(list))
+    langs: Counter = field(default_factory=Counter)
+
+
+def aggregate(examples: Iterable[Dict]) -> DatasetStats:
+    """
+    Collect every statistic the report needs in a single pass.
+
+    Works directly on the streaming loader, so aggregation happens while
+    the file is parsed. Only the first few examples of each category are
+    kept (for display), so memory stays bounded as the dataset grows.
+    """
+    stats = DatasetStats()
+
     for ex in examples:
+        stats.total += 1
+        stats.deaths += ex.get('deaths', 0)
+        stats.financial += ex.get('financial_loss_usd', 0)
+
         root_cause = ex.get('root_cause', 'unknown')
-        root_causes[root_cause] += 1
-        
-        invariants = invariant_map.get(root_cause, ['unknown'])
-        for inv in invariants:
-            needed_invariants[inv] += 1
-    
+        stats.root_causes[root_cause] += 1
+        stats.needed_invariants.update(invariant_map.get(root_cause, _UNKNOWN))
+
+        cat = ex.get('category', 'unknown')
+        stats.category_counts[cat] += 1
+        samples = stats.by_category[cat]
+        if len(samples) < 3:
+            samples.append(ex)
+
+        stats.langs[ex.get('language', 'unknown')] += 1
+
+    return stats
+
+
+def analyze_root_causes(stats: DatasetStats):
+    """Report root causes and the invariants they require."""
+
+    print("\n" + BANNER)
+    print("  ROOT CAUSE → INVARIANT MAPPING")
+    print(BANNER)
+
+    needed_invariants = stats.needed_invariants
+    root_causes = stats.root_causes
+
     print("\nRoot Causes (frequency):")
     for cause, count in root_causes.most_common():
         print(f"  {count:2d}x {cause}")
     
-    print("\n" + "-" * 70)
+    print("\n" + RULE)
     print("Invariants Needed (by frequency):")
-    print("-" * 70)
-    
-    # Current vs. needed
-    current_invariants = {
-        'bounds_checked',
-        'null_checked',
-        'authenticated',
-        'authorized',
-        'encrypted',
-        'rate_limited',
-        'audit_logged',
-    }
+    print(RULE)
     
     for inv, count in needed_invariants.most_common():
         status = "✅ EXISTS" if inv in current_invariants else "❌ MISSING"
@@ -106,38 +255,9 @@ def analyze_root_causes(examples):
     # Group missing by category
     missing = [inv for inv in needed_invariants if inv not in current_invariants]
     
-    print("\n" + "=" * 70)
+    print("\n" + BANNER)
     print("  MISSING INVARIANTS BY CATEGORY")
-    print("=" * 70)
-    
-    categories = {
-        'Memory Safety': [
-            'input_length_validated', 'malloc_checked', 'initialized_before_use',
-            'overflow_checked', 'safe_arithmetic'
-        ],
-        'Concurrency': [
-            'mutex_protected', 'atomic_operation', 'critical_section',
-        ],
-        'Input Validation': [
-            'input_sanitized', 'parameterized_query', 'deserialization_safe',
-            'type_validated', 'parser_bounded', 'input_validated'
-        ],
-        'State Management': [
-            'state_machine_valid', 'invariant_maintained', 'prototype_frozen',
-            'property_validated'
-        ],
-        'Security': [
-            'certificate_validated', 'dependency_verified', 'checksum_validated',
-            'classloader_restricted'
-        ],
-        'Resource Management': [
-            'regex_bounded', 'timeout_set', 'speculation_barrier',
-        ],
-        'Configuration': [
-            'units_consistent', 'configuration_validated', 'dependency_exists',
-            'precision_aware'
-        ],
-    }
+    print(BANNER)
     
     for category, invs in categories.items():
         missing_in_cat = [i for i in invs if i in missing]
@@ -146,108 +266,49 @@ def analyze_root_causes(examples):
             for inv in missing_in_cat:
                 count = needed_invariants[inv]
                 print(f"  {count:2d}x {inv}")
-    
-    return needed_invariants, root_causes
 
 
-def analyze_by_category(examples):
-    """Analyze by catastrophe category."""
+def analyze_by_category(stats: DatasetStats):
+    """Report catastrophes grouped by category."""
     
-    print("\n" + "=" * 70)
+    print("\n" + BANNER)
     print("  CATASTROPHE CATEGORIES")
-    print("=" * 70)
-    
-    by_category = defaultdict(list)
+    print(BANNER)
     
-    for ex in examples:
-        cat = ex.get('category', 'unknown')
-        by_category[cat].append(ex)
-    
-    for cat, exs in sorted(by_category.items()):
-        print(f"\n{cat.upper()} ({len(exs)} examples):")
+    for cat, exs in sorted(stats.by_category.items()):
+        count = stats.category_counts[cat]
+        print(f"\n{cat.upper()} ({count} examples):")
         
         # Show sample
-        for ex in exs[:3]:
+        for ex in islice(exs, 3):
             name = ex.get('name', 'Unknown')
             deaths = ex.get('deaths', 0)
             loss = ex.get('financial_loss_usd', 0)
             print(f"  • {name:40s} {deaths} deaths, ${loss:,}")
         
-        if len(exs) > 3:
-            print(f"  ... and {len(exs) - 3} more")
+        if count > 3:
+            print(f"  ... and {count - 3} more")
 
 
-def analyze_languages(examples):
-    """Analyze language distribution."""
+def analyze_languages(stats: DatasetStats):
+    """Report the language distribution."""
     
-    print("\n" + "=" * 70)
+    print("\n" + BANNER)
     print("  LANGUAGE DISTRIBUTION")
-    print("=" * 70)
+    print(BANNER)
     
-    langs = Counter(ex.get('language', 'unknown') for ex in examples)
-    
-    for lang, count in langs.most_common():
-        pct = (count / len(examples)) * 100
-        bar = "█" * int(pct / 2)
+    for lang, count in stats.langs.most_common():
+        pct = (count / stats.total) * 100
+        bar = _FULL_BAR[:int(pct / 2)]
         print(f"  {lang:30s} {count:2d} ({pct:5.1f}%) {bar}")
 
 
-def priority_recommendations(needed_invariants, root_causes):
+def priority_recommendations(stats: DatasetStats):
     """Recommend priority order for building invariant detectors."""
     
-    print("\n" + "=" * 70)
+    print("\n" + BANNER)
     print("  PHASE 2 PRIORITY RECOMMENDATIONS")
-    print("=" * 70)
-    
-    # Priority based on:
-    # 1. Frequency in dataset
-    # 2. Severity (death-causing vs. financial)
-    # 3. Detectability (can we realistically detect it via AST?)
-    
-    priorities = [
-        {
-            'name': 'Concurrency Safety',
-            'invariants': ['mutex_protected', 'atomic_operation', 'critical_section'],
-            'reason': 'Death-causing (Therac-25), hard to test, high impact',
-            'examples': ['Therac-25 race condition', 'Dirty COW race condition'],
-            'difficulty': 'Medium',
-        },
-        {
-            'name': 'Input Validation',
-            'invariants': ['input_sanitized', 'deserialization_safe', 'parameterized_query'],
-            'reason': 'Most common root cause (injection, deserialization)',
-            'examples': ['Log4Shell', 'Equifax Struts', 'Rails YAML'],
-            'difficulty': 'Medium',
-        },
-        {
-            'name': 'Integer Safety',
-            'invariants': ['overflow_checked', 'safe_arithmetic'],
-            'reason': 'Subtle, safety-critical (Ariane 5, Patriot missile)',
-            'examples': ['Ariane 5 overflow', 'Patriot missile timing'],
-            'difficulty': 'Easy',
-        },
-        {
-            'name': 'Memory Initialization',
-            'invariants': ['initialized_before_use'],
-            'reason': 'Common in C/C++ codebases',
-            'examples': ['Dirty Pipe', 'goto fail'],
-            'difficulty': 'Hard (requires data flow analysis)',
-        },
-        {
-            'name': 'State Machine Validation',
-            'invariants': ['state_machine_valid', 'invariant_maintained'],
-            'reason': 'Death-causing (737 MAX), complex systems',
-            'examples': ['Boeing 737 MAX MCAS', 'Kubernetes privilege escalation'],
-            'difficulty': 'Hard',
-        },
-        {
-            'name': 'Resource Bounds',
-            'invariants': ['regex_bounded', 'timeout_set', 'parser_bounded'],
-            'reason': 'DoS attacks, common in web services',
-            'examples': ['ua-parser ReDoS', 'XML bomb attacks'],
-            'difficulty': 'Easy',
-        },
-    ]
+    print(BANNER)
     
     print("\nPriority Order (High → Low):\n")
     
@@ -270,26 +331,25 @@ def main():
         print("   Run: python scripts/collect_training_data.py")
         return 1
     
-    print("=" * 70)
+    print(BANNER)
     print("  DarkSeer Training Dataset Analysis")
-    print("=" * 70)
+    print(BANNER)
     
-    data = load_dataset(dataset_path)
-    examples = data.get('examples', [])
+    stats = aggregate(load_dataset(dataset_path))
     
-    print(f"\n📊 Dataset: {len(examples)} catastrophes")
-    print(f"   Deaths: {sum(ex.get('deaths', 0) for ex in examples)}")
-    print(f"   Financial: ${sum(ex.get('financial_loss_usd', 0) for ex in examples):,}")
+    print(f"\n📊 Dataset: {stats.total} catastrophes")
+    print(f"   Deaths: {stats.deaths}")
+    print(f"   Financial: ${stats.financial:,}")
     
     # Run analyses
-    needed_invariants, root_causes = analyze_root_causes(examples)
-    analyze_by_category(examples)
-    analyze_languages(examples)
-    priority_recommendations(needed_invariants, root_causes)
+    analyze_root_causes(stats)
+    analyze_by_category(stats)
+    analyze_languages(stats)
+    priority_recommendations(stats)
     
-    print("\n" + "=" * 70)
+    print("\n" + BANNER)
     print("  Next: Build Priority Invariant Detectors")
-    print("=" * 70)
+    print(BANNER)
     print("\n1. Start with: Concurrency Safety + Input Validation")
     print("2. Add to: ArchIdx/src/arch_packet/ast_invariant_detector.py")
     print("3. Test on: Real catastrophes")
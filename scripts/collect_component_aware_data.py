@@ -13,12 +13,22 @@ For each of 32 catastrophes, collects:
 
 Total: ~2,000 examples (3% catastrophic, 97% safe)
 
-This takes 5-10 minutes due to git operations in temp directories.
+This takes 5-10 minutes of git operations in temp directories, spread
+across up to 8 worker processes (--workers).
 """
 
+import os
 import sys
 import json
+import hashlib
+import argparse
+import functools
+import contextlib
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
+from typing import List, Optional
 from tqdm import tqdm
 
 # Add src to path
@@ -27,8 +37,128 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from training.component_aware_collector import ComponentAwareCollector, SafeCommit
 from training.data_collector import CatastropheDataCollector
 
+# Blobless clones are kept here and reused across runs
+REPO_CACHE_DIR = Path("~/.cache/darkseer/repos").expanduser()
 
-def load_catastrophes_with_repos(catastrophes_json: Path) -> list:
+# Extracted K-hop components, keyed by blob IDs, reused across runs
+COMPONENT_CACHE_PATH = Path("~/.cache/darkseer/components.sqlite").expanduser()
+
+# Per-catastrophe collection results, keyed by everything that affects them
+RESULT_CACHE_DIR = Path(__file__).parent.parent / "data" / ".cache" / "component_aware"
+
+# ijson lets us filter catastrophes while parsing instead of building the
+# whole document first; fall back to json.load when it isn't installed.
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# orjson is a much faster (de)serializer; the stdlib json module is the fallback
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _load_json(path: Path):
+    """Read a JSON file."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(path.read_bytes())
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(obj, path: Path, indent: bool = False):
+    """Write obj to path as JSON: compact, or 2-space indented if indent=True."""
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0))
+    else:
+        with open(path, 'w') as f:
+            if indent:
+                json.dump(obj, f, indent=2)
+            else:
+                json.dump(obj, f, separators=(',', ':'))
+
+
+def _dumps_line(obj) -> bytes:
+    """Serialize obj as one compact JSON Lines record."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj, separators=(',', ':')).encode() + b"\n"
+
+
+def _iter_jsonl(path: Path):
+    """Yield records from a JSON Lines file, skipping a torn final line."""
+    loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except ValueError:
+                # A crash mid-write leaves a partial last line behind
+                continue
+
+
+def _iter_examples(catastrophes_json: Path):
+    """Yield entries of the top-level `examples` array one at a time."""
+    if IJSON_AVAILABLE:
+        with open(catastrophes_json, 'rb') as f:
+            yield from ijson.items(f, 'examples.item', use_float=True)
+    else:
+        yield from _load_json(catastrophes_json).get('examples', [])
+
+
+@dataclass
+class CatastropheJob:
+    """
+    The fields of one catastrophe that collection needs.
+    
+    Unpacked from the raw example dict once at load time, so workers read
+    plain attributes instead of repeating dict lookups. Slotted to keep
+    the per-job footprint small (dataclass(slots=True) needs Python 3.10).
+    """
+    __slots__ = (
+        'id', 'project', 'cve', 'repo_url', 'fix_commit', 'language',
+        'file_path', 'before_code', 'after_code',
+    )
+    id: Optional[str]
+    project: Optional[str]
+    cve: Optional[str]
+    repo_url: str
+    fix_commit: str
+    language: str
+    file_path: str
+    before_code: str
+    after_code: str
+    
+    @classmethod
+    def from_example(cls, example: dict) -> "CatastropheJob":
+        return cls(
+            id=example.get('id'),
+            project=example.get('project'),
+            cve=example.get('cve'),
+            repo_url=example.get('repo_url'),
+            fix_commit=example.get('commit_fixing'),
+            language=example.get('language', 'C').lower(),
+            file_path=example.get('file_path', ''),
+            before_code=example.get('before_code'),
+            after_code=example.get('after_code'),
+        )
+
+
+def eligible(example: dict) -> bool:
+    """True if an example has everything collection needs."""
+    return bool(
+        example.get('repo_url') and example.get('commit_fixing')
+        and example.get('before_code') and example.get('after_code')
+    )
+
+
+def load_catastrophes_with_repos(catastrophes_json: Path) -> List[CatastropheJob]:
     """
     Load catastrophes that have both code and repo info.
     
@@ -36,26 +166,197 @@ def load_catastrophes_with_repos(catastrophes_json: Path) -> list:
     - before_code / after_code
     - repo_url
     - commit_fixing
+    
+    Ineligible entries are dropped here, while streaming, so they never
+    reach the worker pool or count toward the progress bar.
+    """
+    return [
+        CatastropheJob.from_example(example)
+        for example in _iter_examples(catastrophes_json)
+        if eligible(example)
+    ]
+
+
+def code_digest(job: CatastropheJob) -> str:
+    """Hash a catastrophe's before/after code in one pass."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update((job.before_code or '').encode())
+    h.update(b"\0")
+    h.update((job.after_code or '').encode())
+    return h.hexdigest()
+
+
+def cache_key(job: CatastropheJob, k_hops: int, overlap_threshold: float) -> str:
+    """Hash every input that determines a catastrophe's collection result."""
+    parts = (
+        job.repo_url,
+        job.fix_commit,
+        job.file_path,
+        job.language,
+        k_hops,
+        overlap_threshold,
+        code_digest(job),
+    )
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def cached_collect(key: str, fn, *args):
     """
-    with open(catastrophes_json) as f:
-        data = json.load(f)
+    Return fn(*args), reusing a previous result stored under key.
     
-    catastrophes_ready = []
+    Results are (result_entry, safe_commit_rows) tuples of plain dicts,
+    so they round-trip through JSON.
+    """
+    cache_file = RESULT_CACHE_DIR / f"{key}.json"
+    if cache_file.exists():
+        return tuple(_load_json(cache_file))
     
-    for example in data.get('examples', []):
-        repo_url = example.get('repo_url')
-        fix_commit = example.get('commit_fixing')
-        before_code = example.get('before_code')
-        after_code = example.get('after_code')
-        
-        if repo_url and fix_commit and before_code and after_code:
-            catastrophes_ready.append(example)
+    result = fn(*args)
     
-    return catastrophes_ready
+    # Don't pin down empty results: they usually mean a clone failed
+    result_entry, safe_commit_rows = result
+    if safe_commit_rows:
+        RESULT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_json(result, cache_file)
+    return result
+
+
+def process_one(
+    job: CatastropheJob, k_hops: int, overlap_threshold: float, verbose: bool = False
+) -> tuple:
+    """
+    Collect safe commits for one catastrophe.
+    
+    Runs in a worker process, so it builds its own collector. Unless
+    verbose, the worker's progress output is discarded so it doesn't
+    fight the main process's progress bar for the terminal.
+    
+    Returns:
+        (result_entry, list of safe commit dicts)
+    """
+    if verbose:
+        return _process_one(job, k_hops, overlap_threshold)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return _process_one(job, k_hops, overlap_threshold)
+
+
+def process_repo(
+    jobs: List[CatastropheJob],
+    k_hops: int,
+    overlap_threshold: float,
+    verbose: bool = False,
+    use_cache: bool = True,
+) -> list:
+    """
+    Collect every catastrophe of one repo, in order, in one worker.
+    
+    A failure in one catastrophe doesn't stop the rest of the repo.
+    
+    Returns:
+        List of (job, result or None, error message or None)
+    """
+    outcomes = []
+    for job in jobs:
+        job_args = (job, k_hops, overlap_threshold)
+        try:
+            if use_cache:
+                result = cached_collect(cache_key(*job_args), process_one, *job_args, verbose)
+            else:
+                result = process_one(*job_args, verbose)
+            outcomes.append((job, result, None))
+        except Exception as e:
+            outcomes.append((job, None, str(e)))
+    return outcomes
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_collector(k_hops: int, overlap_threshold: float) -> ComponentAwareCollector:
+    """
+    One collector per worker process, so its per-commit analysis cache
+    carries over between catastrophes of the same repo.
+    """
+    return ComponentAwareCollector(
+        k_hops=k_hops,
+        overlap_threshold=overlap_threshold,
+        cache_dir=REPO_CACHE_DIR,
+        component_cache_path=COMPONENT_CACHE_PATH,
+    )
+
+
+def _process_one(job: CatastropheJob, k_hops: int, overlap_threshold: float) -> tuple:
+    """Body of process_one, run with stdout already routed."""
+    collector = _worker_collector(k_hops, overlap_threshold)
+    
+    cat_id = job.id
+    project = job.project
+    
+    # Get affected files
+    file_path = job.file_path
+    affected_files = [file_path] if file_path and file_path != 'unknown' else []
+    
+    print(f"\n{'='*70}")
+    print(f"   {project} ({job.cve or 'N/A'})")
+    print(f"{'='*70}")
+    
+    # Collect safe commits for this catastrophe
+    safe_commits = collector.collect_for_catastrophe(
+        repo_url=job.repo_url,
+        fix_commit=job.fix_commit,
+        affected_files=affected_files,
+        language=job.language,
+        catastrophe_before_code=job.before_code,
+        catastrophe_after_code=job.after_code,
+    )
+    
+    result_entry = {
+        'id': cat_id,
+        'project': project,
+        'cve': job.cve,
+        'fix_commit': job.fix_commit,
+        'safe_commits': {
+            'SAFE_BEFORE': [c.commit_hash for c in safe_commits.get('SAFE_BEFORE', [])],
+            'SAFE_AFTER': [c.commit_hash for c in safe_commits.get('SAFE_AFTER', [])],
+            'SAFE_DURING': [c.commit_hash for c in safe_commits.get('SAFE_DURING', [])],
+        }
+    }
+    
+    safe_commit_rows = []
+    for category, commits in safe_commits.items():
+        for commit in commits:
+            safe_commit_rows.append({
+                'commit_hash': commit.commit_hash,
+                'category': commit.category,
+                'project': project,
+                'catastrophe_id': cat_id,
+                'component_overlap': commit.component_overlap,
+                'files': commit.files,
+                'date': commit.date,
+                'message': commit.message,
+            })
+    
+    return result_entry, safe_commit_rows
 
 
 def main():
     """Collect component-aware training data."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Recompute every catastrophe instead of reusing cached results",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=min(8, os.cpu_count() or 1),
+        help="Catastrophes collected in parallel (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-v", "--verbose", action="store_true",
+        help="Show per-catastrophe git progress from the workers",
+    )
+    parser.add_argument(
+        "--pretty", action="store_true",
+        help="Indent the output JSON (default: compact, since it is machine-read)",
+    )
+    args = parser.parse_args()
     
     print("=" * 70)
     print("  DarkSeer Component-Aware Data Collection")
@@ -87,6 +388,9 @@ def main():
     print("🔧 Starting component-aware collection...")
     print(f"   K-hops: {collector.k_hops}")
     print(f"   Overlap threshold: {collector.overlap_threshold}")
+    print(f"   Repo cache: {REPO_CACHE_DIR}")
+    print(f"   Component cache: {COMPONENT_CACHE_PATH}")
+    print(f"   Workers: {args.workers}")
     print(f"   Target per catastrophe:")
     print(f"      - 20 SAFE_BEFORE (same component)")
     print(f"      - 20 SAFE_AFTER (same component)")
@@ -94,7 +398,72 @@ def main():
     print(f"      - 10 SAFE_RANDOM (different repos)")
     print()
     
-    # Collect for each catastrophe
+    # Completed catastrophes are appended to a JSON Lines journal as they
+    # finish, so a crash loses at most the in-flight ones and a re-run
+    # picks up where the last one stopped.
+    journal_path = output_path.with_suffix('.jsonl')
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.no_cache and journal_path.exists():
+        journal_path.unlink()
+    
+    done_ids = set()
+    if journal_path.exists():
+        done_ids = {record['id'] for record in _iter_jsonl(journal_path)}
+        print(f"   Resuming: {len(done_ids)} catastrophes already in {journal_path.name}")
+        print()
+    pending = [c for c in catastrophes if c.id not in done_ids]
+    
+    # Catastrophes in the same repo go to the same worker and run back to
+    # back, so the repo is cloned (and its history paged in) once. Repos
+    # are independent and git-bound: fan them out across workers.
+    # Processes rather than threads, because component extraction is
+    # CPU-bound Python and each worker redirects its own stdout. Capped so
+    # we don't hammer one git host.
+    by_repo = defaultdict(list)
+    for catastrophe in pending:
+        by_repo[catastrophe.repo_url].append(catastrophe)
+    
+    with open(journal_path, 'ab') as journal, \
+            ProcessPoolExecutor(max_workers=args.workers) as executor:
+        # Terminate a torn line from a crash so it doesn't swallow the next record
+        if journal.tell() and not journal_path.read_bytes().endswith(b"\n"):
+            journal.write(b"\n")
+        
+        futures = [
+            executor.submit(
+                process_repo, jobs, collector.k_hops, collector.overlap_threshold,
+                args.verbose, not args.no_cache,
+            )
+            for jobs in by_repo.values()
+        ]
+        
+        # Only draw the bar on a terminal; redirected runs (CI, nohup) get
+        # plain output without the per-update formatting. Verbose workers
+        # print straight to the terminal from their own processes, which
+        # would tear the bar, so it is off there too.
+        progress = tqdm(
+            total=len(pending), desc="Processing catastrophes",
+            disable=args.verbose or not sys.stderr.isatty(),
+            mininterval=1.0, miniters=1, smoothing=0,
+        )
+        for future in as_completed(futures):
+            for catastrophe, result, error in future.result():
+                progress.update(1)
+                if error is not None:
+                    tqdm.write(f"   ❌ Error processing {catastrophe.project}: {error}")
+                    continue
+                result_entry, safe_commit_rows = result
+                journal.write(_dumps_line({
+                    'id': result_entry['id'],
+                    'catastrophe': result_entry,
+                    'safe_commits': safe_commit_rows,
+                }))
+            journal.flush()
+        progress.close()
+    
+    # Build the final artifact from the journal, in input order so the
+    # output is deterministic
+    records = {record['id']: record for record in _iter_jsonl(journal_path)}
     all_data = {
         'catastrophes': [],
         'safe_commits': [],
@@ -105,81 +474,24 @@ def main():
             'total_safe_commits': 0,
         }
     }
-    
+    by_category = Counter()
     processed = 0
-    
-    for catastrophe in tqdm(catastrophes, desc="Processing catastrophes"):
-        cat_id = catastrophe.get('id')
-        project = catastrophe.get('project')
-        cve = catastrophe.get('cve')
-        repo_url = catastrophe.get('repo_url')
-        fix_commit = catastrophe.get('commit_fixing')
-        language = catastrophe.get('language', 'C').lower()
-        before_code = catastrophe.get('before_code')
-        after_code = catastrophe.get('after_code')
-        
-        # Get affected files
-        file_path = catastrophe.get('file_path', '')
-        affected_files = [file_path] if file_path and file_path != 'unknown' else []
-        
-        print(f"\n{'='*70}")
-        print(f"   {project} ({cve or 'N/A'})")
-        print(f"{'='*70}")
-        
-        try:
-            # Collect safe commits for this catastrophe
-            safe_commits = collector.collect_for_catastrophe(
-                repo_url=repo_url,
-                fix_commit=fix_commit,
-                affected_files=affected_files,
-                language=language,
-                catastrophe_before_code=before_code,
-                catastrophe_after_code=after_code,
-            )
-            
-            # Store results
-            result_entry = {
-                'id': cat_id,
-                'project': project,
-                'cve': cve,
-                'fix_commit': fix_commit,
-                'safe_commits': {
-                    'SAFE_BEFORE': [c.commit_hash for c in safe_commits.get('SAFE_BEFORE', [])],
-                    'SAFE_AFTER': [c.commit_hash for c in safe_commits.get('SAFE_AFTER', [])],
-                    'SAFE_DURING': [c.commit_hash for c in safe_commits.get('SAFE_DURING', [])],
-                }
-            }
-            
-            all_data['catastrophes'].append(result_entry)
-            
-            # Add safe commits to global list
-            for category, commits in safe_commits.items():
-                for commit in commits:
-                    all_data['safe_commits'].append({
-                        'commit_hash': commit.commit_hash,
-                        'category': commit.category,
-                        'project': project,
-                        'catastrophe_id': cat_id,
-                        'component_overlap': commit.component_overlap,
-                        'files': commit.files,
-                        'date': commit.date,
-                        'message': commit.message,
-                    })
-            
-            processed += 1
-            
-        except Exception as e:
-            print(f"   ❌ Error processing {project}: {e}")
+    for catastrophe in catastrophes:
+        record = records.pop(catastrophe.id, None)
+        if record is None:
             continue
+        all_data['catastrophes'].append(record['catastrophe'])
+        all_data['safe_commits'].extend(record['safe_commits'])
+        by_category.update(row['category'] for row in record['safe_commits'])
+        processed += 1
     
     # Update metadata
     all_data['metadata']['total_catastrophes'] = processed
     all_data['metadata']['total_safe_commits'] = len(all_data['safe_commits'])
     
-    # Save results
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(all_data, f, indent=2)
+    # Save results; the journal has served its purpose once this succeeds
+    _write_json(all_data, output_path, indent=args.pretty)
+    journal_path.unlink()
     
     print(f"\n{'='*70}")
     print("  COLLECTION COMPLETE")
@@ -189,11 +501,6 @@ def main():
     print(f"   Safe commits collected: {len(all_data['safe_commits'])}")
     
     # Breakdown by category
-    by_category = {}
-    for commit in all_data['safe_commits']:
-        cat = commit['category']
-        by_category[cat] = by_category.get(cat, 0) + 1
-    
     print(f"\n   By category:")
     for cat, count in sorted(by_category.items()):
         print(f"      {cat}: {count}")
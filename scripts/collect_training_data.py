@@ -7,24 +7,40 @@ This script:
 2. Uses surgical fetch to get commit windows
 3. Extracts code diffs (before/after)
 4. Collects safe commits from the same repos (component-aware sampling)
-5. Outputs training dataset in JSON format
+5. Outputs training dataset in JSON Lines format (one example per line),
+   plus a small metadata JSON
 """
 
 import json
 import sys
 import tempfile
 import random
+import heapq
+from operator import itemgetter
 from pathlib import Path
 from datetime import datetime
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from typing import List, Optional
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from training.types import CatastropheRecord, CatastropheType, TrainingExample
+from training.types import CatastropheRecord, CommitWindow, TrainingExample
 from training.surgical_fetch import SurgicalFetcher, FetchConfig
 
+# orjson serializes examples much faster than the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Blobless clones are shared across records (and runs), one per repo URL
+REPO_CACHE_DIR = Path("~/.cache/darkseer/repos").expanduser()
+
+# Commit windows and diffs from earlier runs, so re-runs skip the git work
+WINDOW_CACHE_PATH = Path("~/.cache/darkseer/window_cache.sqlite").expanduser()
+
 
 @dataclass
 class CollectionConfig:
@@ -36,58 +52,45 @@ class CollectionConfig:
     output_dir: Path = Path("data/training")
 
 
+def _dumps_line(obj) -> bytes:
+    """Serialize obj as one compact JSON Lines record."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj, separators=(',', ':')).encode() + b"\n"
+
+
+def _write_json(obj, path: Path):
+    """Write obj to path as 2-space indented JSON."""
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
 def load_verified_catastrophes() -> List[CatastropheRecord]:
-    """Load only verified catastrophes from JSON."""
+    """Load only verified catastrophes (with a fixing commit) from JSON."""
     json_path = Path(__file__).parent.parent / "data" / "verified_catastrophes.json"
-    
-    with open(json_path) as f:
-        data = json.load(f)
-    
-    records = []
-    for cat in data.get("catastrophes", []):
-        if not cat.get("verified"):
-            continue
-        if not cat.get("fixing_commits"):
-            continue
-            
-        record = CatastropheRecord(
-            id=cat["id"],
-            name=cat["name"],
-            cve=cat.get("cve"),
-            repo_url=cat["repo_url"],
-            breaking_commits=cat.get("breaking_commits", []),
-            fixing_commits=cat.get("fixing_commits", []),
-            catastrophe_type=CatastropheType(cat.get("catastrophe_type", "sudden")),
-            is_systemic=cat.get("is_systemic", False),
-            latency_years=cat.get("latency_years"),
-            language=cat.get("language", "c"),
-            affected_files=cat.get("affected_files", []),
-            severity_score=cat.get("severity_score", 5),
-            deaths=cat.get("deaths", 0),
-            financial_loss_usd=cat.get("financial_loss_usd", 0),
-            year=cat.get("year", 2020),
-            description=cat.get("description", ""),
-            verified=True,
-        )
-        records.append(record)
-    
-    return records
+    return [r for r in CatastropheRecord.load_verified(json_path) if r.fixing_commits]
 
 
 def collect_catastrophic_examples(
     record: CatastropheRecord,
     fetcher: SurgicalFetcher,
-    work_dir: Path,
+    repo_dir: Path,
+    windows: List[CommitWindow],
 ) -> List[TrainingExample]:
     """Collect catastrophic examples from a single catastrophe."""
     examples = []
     
     try:
-        repo_dir, windows = fetcher.fetch_catastrophe_window(record, work_dir)
+        # Read every fixing commit's diff in one batch (a fix series has
+        # several) rather than a round of git processes per commit
+        diffs = fetcher.batch_commit_diffs(repo_dir, [w.target_sha for w in windows])
         
         for window in windows:
             # Get diff for the target commit
-            before, after, files = fetcher.get_commit_diff(repo_dir, window.target_sha)
+            before, after, files = diffs.get(window.target_sha, ("", "", []))
             
             if not before and not after:
                 continue
@@ -113,7 +116,8 @@ def collect_catastrophic_examples(
 def collect_safe_examples(
     record: CatastropheRecord,
     fetcher: SurgicalFetcher,
-    work_dir: Path,
+    repo_dir: Path,
+    windows: List[CommitWindow],
     catastrophic_files: List[str],
     count: int,
 ) -> List[TrainingExample]:
@@ -126,8 +130,6 @@ def collect_safe_examples(
     examples = []
     
     try:
-        repo_dir, windows = fetcher.fetch_catastrophe_window(record, work_dir)
-        
         if not windows:
             return []
         
@@ -135,25 +137,33 @@ def collect_safe_examples(
         window = windows[0]
         safe_candidates = window.ancestors + window.descendants
         
-        # Score by component overlap
+        # Score on changed file names alone (no blob reads), then fetch
+        # contents only for the candidates that make the cut
+        files_by_sha = fetcher.batch_changed_files(repo_dir, safe_candidates)
+        
+        # Score by component overlap; the catastrophic side is built once
+        cat_file_set = frozenset(catastrophic_files)
+        inv_cat_len = 1.0 / max(len(cat_file_set), 1)
         scored = []
         for sha in safe_candidates:
-            try:
-                before, after, files = fetcher.get_commit_diff(repo_dir, sha)
-                if not files:
-                    continue
-                    
-                # Calculate component overlap
-                overlap = len(set(files) & set(catastrophic_files)) / max(len(catastrophic_files), 1)
-                scored.append((sha, before, after, files, overlap))
-            except:
+            files = files_by_sha.get(sha)
+            if not files:
                 continue
+            
+            # Calculate component overlap
+            overlap = len(cat_file_set.intersection(files)) * inv_cat_len
+            scored.append((sha, overlap))
         
-        # Sort by overlap (higher = more similar to catastrophic)
-        scored.sort(key=lambda x: x[4], reverse=True)
+        # Take the top N by overlap (higher = more similar to catastrophic).
+        # nlargest is a partial heap sort, same order as a full sort's prefix.
+        top = heapq.nlargest(count, scored, key=itemgetter(1))
+        diffs = fetcher.batch_commit_diffs(repo_dir, [sha for sha, _ in top])
         
-        # Take top N
-        for sha, before, after, files, overlap in scored[:count]:
+        for sha, overlap in top:
+            before, after, files = diffs.get(sha, ("", "", []))
+            if not files:
+                continue
+            
             example = TrainingExample(
                 commit_sha=sha,
                 repo_url=record.repo_url,
@@ -190,65 +200,78 @@ def main():
     fetch_config = FetchConfig(
         ancestors_count=config.ancestors_count,
         descendants_count=config.descendants_count,
+        repo_cache_dir=REPO_CACHE_DIR,
+        window_cache_path=WINDOW_CACHE_PATH,
     )
-    fetcher = SurgicalFetcher(fetch_config)
+    # Examples go to disk as soon as each record produces them, one JSON
+    # object per line, so memory never holds the whole dataset
+    output_path = config.output_dir / "training_data.jsonl"
+    meta_path = config.output_dir / "training_data.meta.json"
     
-    all_catastrophic = []
-    all_safe = []
+    catastrophic_total = 0
+    safe_total = 0
     
-    for i, record in enumerate(records):
-        print(f"\n[{i+1}/{len(records)}] Processing {record.name} ({record.cve})")
-        print(f"  Repo: {record.repo_url}")
-        
-        with tempfile.TemporaryDirectory(prefix="darkseer_collect_") as temp_dir:
-            work_dir = Path(temp_dir)
-            
-            # Collect catastrophic examples
-            print("  Collecting catastrophic examples...")
-            catastrophic = collect_catastrophic_examples(record, fetcher, work_dir)
-            print(f"  ✓ Found {len(catastrophic)} catastrophic examples")
-            
-            # Get files from catastrophic commits for component-aware sampling
-            cat_files = []
-            for ex in catastrophic:
-                cat_files.extend(ex.changed_files)
-            cat_files = list(set(cat_files))
-            
-            # Collect safe examples
-            print("  Collecting safe examples...")
-            safe_count = min(len(catastrophic) * config.safe_ratio, config.max_safe_per_repo)
-            safe = collect_safe_examples(record, fetcher, work_dir, cat_files, safe_count)
-            print(f"  ✓ Found {len(safe)} safe examples")
+    with SurgicalFetcher(fetch_config) as fetcher, open(output_path, 'wb') as out:
+        for i, record in enumerate(records):
+            print(f"\n[{i+1}/{len(records)}] Processing {record.name} ({record.cve})")
+            print(f"  Repo: {record.repo_url}")
             
-            all_catastrophic.extend(catastrophic)
-            all_safe.extend(safe)
+            # Clones live in REPO_CACHE_DIR, so records sharing a repo clone it once
+            with tempfile.TemporaryDirectory(prefix="darkseer_collect_") as temp_dir:
+                work_dir = Path(temp_dir)
+                
+                # Fetch the commit windows once; both collectors read from them
+                try:
+                    repo_dir, windows = fetcher.fetch_catastrophe_window(record, work_dir)
+                except Exception as e:
+                    print(f"  ❌ Error fetching {record.id}: {e}")
+                    continue
+                
+                # Collect catastrophic examples
+                print("  Collecting catastrophic examples...")
+                catastrophic = collect_catastrophic_examples(record, fetcher, repo_dir, windows)
+                print(f"  ✓ Found {len(catastrophic)} catastrophic examples")
+                
+                # Get files from catastrophic commits for component-aware sampling
+                # (deduped in first-seen order, so runs are reproducible)
+                cat_files = list(dict.fromkeys(
+                    f for ex in catastrophic for f in ex.changed_files
+                ))
+                
+                # Collect safe examples
+                print("  Collecting safe examples...")
+                safe_count = min(len(catastrophic) * config.safe_ratio, config.max_safe_per_repo)
+                safe = collect_safe_examples(
+                    record, fetcher, repo_dir, windows, cat_files, safe_count
+                )
+                print(f"  ✓ Found {len(safe)} safe examples")
+                
+                for ex in catastrophic + safe:
+                    out.write(_dumps_line(ex.to_dict()))
+                out.flush()
+                catastrophic_total += len(catastrophic)
+                safe_total += len(safe)
     
     # Summary
     print("\n" + "=" * 60)
     print("  COLLECTION SUMMARY")
     print("=" * 60)
-    print(f"  Catastrophic examples: {len(all_catastrophic)}")
-    print(f"  Safe examples: {len(all_safe)}")
-    print(f"  Total: {len(all_catastrophic) + len(all_safe)}")
-    print(f"  Ratio: 1:{len(all_safe) // max(len(all_catastrophic), 1)}")
+    print(f"  Catastrophic examples: {catastrophic_total}")
+    print(f"  Safe examples: {safe_total}")
+    print(f"  Total: {catastrophic_total + safe_total}")
+    print(f"  Ratio: 1:{safe_total // max(catastrophic_total, 1)}")
     
-    # Save to JSON
-    output = {
-        "metadata": {
-            "created": datetime.now().isoformat(),
-            "catastrophes_count": len(records),
-            "catastrophic_examples": len(all_catastrophic),
-            "safe_examples": len(all_safe),
-        },
-        "catastrophic": [asdict(ex) for ex in all_catastrophic],
-        "safe": [asdict(ex) for ex in all_safe],
+    # Metadata sits beside the examples (is_catastrophic marks each line)
+    metadata = {
+        "created": datetime.now().isoformat(),
+        "catastrophes_count": len(records),
+        "catastrophic_examples": catastrophic_total,
+        "safe_examples": safe_total,
     }
-    
-    output_path = config.output_dir / "training_data.json"
-    with open(output_path, 'w') as f:
-        json.dump(output, f, indent=2)
+    _write_json(metadata, meta_path)
     
     print(f"\n  ✓ Saved to {output_path}")
+    print(f"    Metadata: {meta_path}")
     
     return 0
 
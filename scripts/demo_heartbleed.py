@@ -12,7 +12,7 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from detector.catastrophe_detector import CatastropheDetector
+from detector.catastrophe_detector import CatastropheDetector, DetectionResult
 
 
 # The VULNERABLE Heartbleed code
@@ -69,6 +69,12 @@ int dtls1_process_heartbeat(SSL *s) {
 '''
 
 
+# (name, before_code, after_code, language, file_path) for each demo case
+DEMO_CASES = [
+    ("Heartbleed", VULNERABLE_CODE, FIXED_CODE, "c", "ssl/d1_both.c"),
+]
+
+
 def main():
     """Run Heartbleed detection demo."""
     
@@ -78,19 +84,21 @@ def main():
     print("=" * 70)
     print()
     
-    # Initialize detector
+    # One detector for every case, with parsers primed before the first
     detector = CatastropheDetector(threshold=70)
+    detector.warmup(sorted({case[3] for case in DEMO_CASES}))
     
+    # Analyze every case in one batch (risk scores in one vectorized pass)
     print("🔍 Analyzing vulnerable code vs. fixed code...")
     print()
+    results = detector.analyze_batch(case[1:] for case in DEMO_CASES)
     
-    # Analyze the change
-    result = detector.analyze_change(
-        before_code=VULNERABLE_CODE,
-        after_code=FIXED_CODE,
-        language="c",
-        file_path="ssl/d1_both.c",
-    )
+    for (name, *_), result in zip(DEMO_CASES, results):
+        report_case(name, result)
+
+
+def report_case(name: str, result: DetectionResult):
+    """Print the report for one analyzed vulnerable/fixed pair."""
     
     # Display results
     print("=" * 70)
@@ -132,7 +140,7 @@ def main():
     print("=" * 70)
     
     if result.is_catastrophic:
-        print("  ✅ DarkSeer correctly identified Heartbleed as CATASTROPHIC")
+        print(f"  ✅ DarkSeer correctly identified {name} as CATASTROPHIC")
     else:
         print("  ❌ Failed to detect catastrophic nature")
     
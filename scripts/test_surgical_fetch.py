@@ -8,7 +8,6 @@ Tests the efficient git fetching strategy on:
 3. Log4Shell (Log4j, GitHub)
 """
 
-import json
 import sys
 import tempfile
 from pathlib import Path
@@ -16,44 +15,14 @@ from pathlib import Path
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from training.types import CatastropheRecord, CatastropheType
-from training.surgical_fetch import SurgicalFetcher, FetchConfig
+from training.types import CatastropheRecord
+from training.surgical_fetch import CommitView, SurgicalFetcher, FetchConfig
 
 
 def load_verified_catastrophes() -> list:
     """Load verified catastrophes from JSON."""
     json_path = Path(__file__).parent.parent / "data" / "verified_catastrophes.json"
-    
-    with open(json_path) as f:
-        data = json.load(f)
-    
-    records = []
-    for cat in data.get("catastrophes", []):
-        if not cat.get("verified"):
-            continue
-            
-        record = CatastropheRecord(
-            id=cat["id"],
-            name=cat["name"],
-            cve=cat.get("cve"),
-            repo_url=cat["repo_url"],
-            breaking_commits=cat.get("breaking_commits", []),
-            fixing_commits=cat.get("fixing_commits", []),
-            catastrophe_type=CatastropheType(cat.get("catastrophe_type", "sudden")),
-            is_systemic=cat.get("is_systemic", False),
-            latency_years=cat.get("latency_years"),
-            language=cat.get("language", "c"),
-            affected_files=cat.get("affected_files", []),
-            severity_score=cat.get("severity_score", 5),
-            deaths=cat.get("deaths", 0),
-            financial_loss_usd=cat.get("financial_loss_usd", 0),
-            year=cat.get("year", 2020),
-            description=cat.get("description", ""),
-            verified=True,
-        )
-        records.append(record)
-    
-    return records
+    return CatastropheRecord.load_verified(json_path)
 
 
 def test_single_catastrophe(record: CatastropheRecord, fetcher: SurgicalFetcher):
@@ -92,6 +61,17 @@ def test_single_catastrophe(record: CatastropheRecord, fetcher: SurgicalFetcher)
                 print(f"    Before: {len(before)} chars")
                 print(f"    After: {len(after)} chars")
                 print(f"    Files: {files[:3]}{'...' if len(files) > 3 else ''}")
+                
+                # Test reading every commit in the window (without checkouts)
+                print(f"\n  Testing iterate_commits on {window.target_sha[:8]}'s window...")
+                fetcher.prefetch_blobs(repo_dir, window.all_commits)
+                tracked = files[0] if files else None
+                
+                def visit(sha: str, view: CommitView):
+                    size = len(view.read(tracked)) if tracked else 0
+                    print(f"    {sha[:8]}: {len(view.list_files())} files, {tracked}: {size} chars")
+                
+                fetcher.iterate_commits(repo_dir, window, visit)
             
             return True
             
@@ -116,13 +96,13 @@ def main():
         ancestors_count=5,   # Smaller for testing
         descendants_count=5,
     )
-    fetcher = SurgicalFetcher(config)
     
     # Test each
     results = {}
-    for record in records:
-        success = test_single_catastrophe(record, fetcher)
-        results[record.id] = success
+    with SurgicalFetcher(config) as fetcher:
+        for record in records:
+            success = test_single_catastrophe(record, fetcher)
+            results[record.id] = success
     
     # Summary
     print("\n" + "=" * 60)
@@ -13,13 +13,18 @@ The trained encoder will:
 3. Generalize to novel vulnerability types
 """
 
+import os
 import sys
 import json
+import contextlib
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.optim as optim
+import torch.distributed as dist
 from pathlib import Path
-from torch.utils.data import DataLoader, random_split
+from torch.nn.parallel import DistributedDataParallel as DDP
+from torch.utils.data import DataLoader, DistributedSampler, random_split
 from tqdm import tqdm
 
 # Add src to path
@@ -37,11 +42,17 @@ class CatastropheClassifier(nn.Module):
     the full ArchIdx hierarchical encoder.
     """
     
-    def __init__(self, input_dim: int):
+    # Width of the learned language embedding
+    LANGUAGE_DIM = 8
+    
+    def __init__(self, input_dim: int, num_languages: int):
         super().__init__()
         
+        # The language is an index; its embedding joins the feature vector
+        self.language_embedding = nn.Embedding(num_languages, self.LANGUAGE_DIM)
+        
         self.encoder = nn.Sequential(
-            nn.Linear(input_dim, 256),
+            nn.Linear(input_dim + self.LANGUAGE_DIM, 256),
             nn.ReLU(),
             nn.Dropout(0.3),
             
@@ -57,93 +68,268 @@ class CatastropheClassifier(nn.Module):
         self.classifier = nn.Linear(64, 1)  # Is catastrophic?
         self.regressor = nn.Linear(64, 1)   # Severity score
     
-    def forward(self, x):
+    def forward(self, x, language_id):
+        """
+        Returns (catastrophic logit, severity in [0, 1]).
+        
+        The classification head stays a logit so the loss can fuse the
+        sigmoid (BCEWithLogitsLoss), which is stable under autocast. Apply
+        torch.sigmoid to get a probability.
+        """
+        x = torch.cat([x, self.language_embedding(language_id)], dim=-1)
         features = self.encoder(x)
-        is_catastrophic = torch.sigmoid(self.classifier(features))
+        is_catastrophic = self.classifier(features)
         severity = torch.sigmoid(self.regressor(features))
         return is_catastrophic, severity
 
 
-def train_epoch(model, dataloader, optimizer, device):
-    """Train for one epoch."""
+# Loss functions are stateless, so one instance of each serves every batch
+bce_loss = nn.BCEWithLogitsLoss()
+mse_loss = nn.MSELoss()
+
+
+def amp_dtype(device):
+    """
+    Pick the autocast dtype for device, or None to run in FP32.
+    
+    bf16 on GPUs that support it (Ampere+; no loss scaling needed),
+    fp16 with a GradScaler on older GPUs, plain FP32 on CPU.
+    """
+    if device.type != 'cuda':
+        return None
+    if torch.cuda.is_bf16_supported():
+        return torch.bfloat16
+    return torch.float16
+
+
+def init_distributed():
+    """
+    Join the torchrun process group, if launched under torchrun.
+    
+    Returns:
+        (local_rank, world_size); (0, 1) for a plain single-process run
+    """
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    if world_size < 2:
+        return 0, 1
+    
+    local_rank = int(os.environ['LOCAL_RANK'])
+    if torch.cuda.is_available():
+        torch.cuda.set_device(local_rank)
+        dist.init_process_group(backend='nccl')
+    else:
+        dist.init_process_group(backend='gloo')
+    return local_rank, world_size
+
+
+def unwrap_model(model: nn.Module) -> nn.Module:
+    """Strip torch.compile and DDP wrappers, for saving a plain state_dict."""
+    model = getattr(model, '_orig_mod', model)
+    return getattr(model, 'module', model)
+
+
+def save_int8_checkpoint(fp32_path: Path, input_dim: int, num_languages: int, int8_path: Path):
+    """
+    Save a dynamically quantized (int8 Linear) copy of a checkpoint.
+    
+    For CPU inference: weights are 4x smaller and the Linear layers run
+    as int8 matmuls. Activations stay FP32, so the sigmoid heads are
+    unaffected. Load it into a quantize_dynamic'd CatastropheClassifier.
+    """
+    model = CatastropheClassifier(input_dim, num_languages)
+    model.load_state_dict(torch.load(fp32_path, map_location='cpu'))
+    model.eval()
+    q_model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    torch.save(q_model.state_dict(), int8_path)
+
+
+def compile_model(model: nn.Module, input_dim: int, batch_size: int, device) -> nn.Module:
+    """
+    torch.compile model, or return it unchanged if compiling fails.
+    
+    Compilation is lazy: dynamo/inductor errors (no Triton, no C compiler,
+    an unsupported op) only surface at the first call. So one warm-up
+    training step (forward + backward on a dummy batch of the training
+    shape, gradients then cleared) runs here, where a failure can fall
+    back to eager, rather than aborting inside train_epoch. CUDA only:
+    reduce-overhead pays off through CUDA graphs.
+    """
+    if device.type != 'cuda' or not hasattr(torch, 'compile'):
+        return model
+    
+    compiled = torch.compile(model, mode='reduce-overhead', fullgraph=True)
+    dtype = amp_dtype(device)
+    try:
+        features = torch.zeros(batch_size, input_dim, device=device)
+        language_id = torch.zeros(batch_size, dtype=torch.long, device=device)
+        with torch.autocast(device_type=device.type, dtype=dtype, enabled=dtype is not None):
+            pred_catastrophic, pred_severity = compiled(features, language_id)
+        (pred_catastrophic.float().sum() + pred_severity.float().sum()).backward()
+    except Exception as e:
+        print(f"   ⚠️  torch.compile failed, running eager: {str(e)[:200]}")
+        return model
+    finally:
+        model.zero_grad(set_to_none=True)
+    
+    print("   Compiled: torch.compile (reduce-overhead)")
+    return compiled
+
+
+def is_main_process() -> bool:
+    """True on rank 0, or when not running distributed."""
+    return not dist.is_initialized() or dist.get_rank() == 0
+
+
+def train_epoch(model, dataloader, optimizer, device, scaler=None):
+    """
+    Train for one epoch.
+    
+    scaler is the GradScaler for fp16 autocast; leave it None (or
+    disabled) for bf16/FP32.
+    """
+    dtype = amp_dtype(device)
     model.train()
     total_loss = 0
     correct = 0
     total = 0
     
-    for batch in tqdm(dataloader, desc="Training"):
-        features = batch['features'].to(device)
-        labels = batch['is_catastrophic'].to(device)
-        severity = batch['severity'].to(device)
-        
-        # Forward pass
-        pred_catastrophic, pred_severity = model(features)
+    for batch in tqdm(dataloader, desc="Training", disable=not is_main_process()):
+        features = batch['features'].to(device, non_blocking=True)
+        language_id = batch['language_id'].to(device, non_blocking=True)
+        labels = batch['is_catastrophic'].to(device, non_blocking=True)
+        severity = batch['severity'].to(device, non_blocking=True)
         
-        # Loss: Binary cross-entropy + MSE
-        loss_classification = nn.BCELoss()(pred_catastrophic, labels)
-        loss_regression = nn.MSELoss()(pred_severity, severity)
-        loss = loss_classification + 0.5 * loss_regression  # Weight regression less
+        # Forward pass (mixed precision on GPU)
+        with torch.autocast(device_type=device.type, dtype=dtype, enabled=dtype is not None):
+            pred_catastrophic, pred_severity = model(features, language_id)
+            
+            # Loss: Binary cross-entropy + MSE
+            loss_classification = bce_loss(pred_catastrophic, labels)
+            loss_regression = mse_loss(pred_severity, severity)
+            loss = loss_classification + 0.5 * loss_regression  # Weight regression less
         
         # Backward pass
-        optimizer.zero_grad()
-        loss.backward()
-        optimizer.step()
+        optimizer.zero_grad(set_to_none=True)
+        if scaler is not None and scaler.is_enabled():
+            scaler.scale(loss).backward()
+            scaler.step(optimizer)
+            scaler.update()
+        else:
+            loss.backward()
+            optimizer.step()
         
         total_loss += loss.item()
         
-        # Accuracy
-        predicted = (pred_catastrophic > 0.5).float()
+        # Accuracy (logit > 0 is probability > 0.5)
+        predicted = (pred_catastrophic > 0).float()
         correct += (predicted == labels).sum().item()
         total += labels.size(0)
     
-    avg_loss = total_loss / len(dataloader)
-    accuracy = correct / total
+    avg_loss = total_loss / max(len(dataloader), 1)
+    accuracy = correct / max(total, 1)
     
     return avg_loss, accuracy
 
 
 def validate(model, dataloader, device):
-    """Validate the model."""
+    """
+    Validate the model.
+    
+    Metrics and predictions stay on the device until the loop ends, so the
+    whole pass syncs with the GPU once instead of every batch. Under
+    torchrun each rank validates its own shard; the metrics are summed
+    and the predictions gathered across ranks, so every rank returns the
+    same results for the whole validation set.
+    
+    Returns:
+        (avg_loss, accuracy, probabilities, labels, example ids); the
+        probabilities and labels are (N, 1) NumPy arrays
+    """
     model.eval()
-    total_loss = 0
-    correct = 0
+    total_loss = torch.zeros((), device=device)
+    correct = torch.zeros((), device=device, dtype=torch.long)
     total = 0
     
-    all_preds = []
-    all_labels = []
+    pred_chunks = []
+    label_chunks = []
     all_ids = []
     
-    with torch.no_grad():
+    dtype = amp_dtype(device)
+    with torch.inference_mode(), \
+            torch.autocast(device_type=device.type, dtype=dtype, enabled=dtype is not None):
         for batch in dataloader:
-            features = batch['features'].to(device)
-            labels = batch['is_catastrophic'].to(device)
-            severity = batch['severity'].to(device)
+            features = batch['features'].to(device, non_blocking=True)
+            language_id = batch['language_id'].to(device, non_blocking=True)
+            labels = batch['is_catastrophic'].to(device, non_blocking=True)
+            severity = batch['severity'].to(device, non_blocking=True)
             
-            pred_catastrophic, pred_severity = model(features)
+            pred_catastrophic, pred_severity = model(features, language_id)
             
-            loss_classification = nn.BCELoss()(pred_catastrophic, labels)
-            loss_regression = nn.MSELoss()(pred_severity, severity)
+            loss_classification = bce_loss(pred_catastrophic, labels)
+            loss_regression = mse_loss(pred_severity, severity)
             loss = loss_classification + 0.5 * loss_regression
             
-            total_loss += loss.item()
+            # Summed per example, so shards of any size average correctly
+            total_loss += loss.float() * labels.size(0)
             
-            predicted = (pred_catastrophic > 0.5).float()
-            correct += (predicted == labels).sum().item()
+            predicted = (pred_catastrophic > 0).float()
+            correct += (predicted == labels).sum()
             total += labels.size(0)
             
-            # Store for analysis
-            all_preds.extend(pred_catastrophic.cpu().numpy())
-            all_labels.extend(labels.cpu().numpy())
+            # Store for analysis (as probabilities, in FP32)
+            pred_chunks.append(torch.sigmoid(pred_catastrophic.float()))
+            label_chunks.append(labels)
             all_ids.extend(batch['example_id'])
     
-    avg_loss = total_loss / len(dataloader)
-    accuracy = correct / total
+    # One device-to-host transfer for the whole pass
+    if pred_chunks:
+        all_preds = torch.cat(pred_chunks).cpu().numpy()
+        all_labels = torch.cat(label_chunks).cpu().numpy()
+    else:
+        all_preds = all_labels = np.zeros((0, 1), dtype=np.float32)
+    
+    if dist.is_initialized():
+        stats = torch.stack([
+            total_loss.double(), correct.double(), torch.tensor(total, dtype=torch.float64, device=device),
+        ])
+        dist.all_reduce(stats)
+        total_loss, correct, total = stats[0], stats[1], int(stats[2].item())
+        
+        shards = [None] * dist.get_world_size()
+        dist.all_gather_object(shards, (all_preds, all_labels, all_ids))
+        all_preds = np.concatenate([shard[0] for shard in shards])
+        all_labels = np.concatenate([shard[1] for shard in shards])
+        all_ids = [i for shard in shards for i in shard[2]]
+    
+    avg_loss = total_loss.item() / max(total, 1)
+    accuracy = correct.item() / max(total, 1)
     
     return avg_loss, accuracy, all_preds, all_labels, all_ids
 
 
 def main():
-    """Train the catastrophe detector."""
+    """
+    Train the catastrophe detector.
+    
+    Runs single-process by default. Launched with torchrun, e.g.
+    `torchrun --nproc_per_node=4 scripts/train.py`, each rank trains a
+    DistributedDataParallel replica on its shard; only rank 0 reports and
+    writes files.
+    """
+    local_rank, world_size = init_distributed()
+    try:
+        if is_main_process():
+            return train(local_rank, world_size)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            return train(local_rank, world_size)
+    finally:
+        if dist.is_initialized():
+            dist.destroy_process_group()
+
+
+def train(local_rank: int = 0, world_size: int = 1):
+    """Training pipeline body; see main()."""
+    distributed = world_size > 1
     
     print("=" * 70)
     print("  DarkSeer / ArchIdx Training Pipeline")
@@ -184,32 +370,82 @@ def main():
     
     # Create dataset
     print("\n🔧 Building dataset...")
-    dataset = DarkSeerDataset(all_examples)
+    # Detected invariants are cached by code hash, so reruns skip parsing.
+    # The examples aren't used again, so their code can be released.
+    invariant_cache_path = Path(__file__).parent.parent / "data" / ".cache" / "invariants.pkl"
+    dataset = DarkSeerDataset(all_examples, invariant_cache_path=invariant_cache_path, drop_code=True)
     
-    # Split train/val
+    # Split train/val (seeded, so every rank draws the same split)
     train_size = int(0.8 * len(dataset))
     val_size = len(dataset) - train_size
-    train_dataset, val_dataset = random_split(dataset, [train_size, val_size])
+    train_dataset, val_dataset = random_split(
+        dataset, [train_size, val_size], generator=torch.Generator().manual_seed(0)
+    )
     
     print(f"   Train: {train_size} examples")
     print(f"   Val: {val_size} examples")
     
-    # Dataloaders
-    train_loader = DataLoader(train_dataset, batch_size=8, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=8, shuffle=False)
+    # Dataloaders; under torchrun each rank reads its own shard. Batches
+    # are pinned for GPU runs so host-to-device copies can be async.
+    # Items are tensor rows, so batches are built in-process: worker
+    # processes would only add IPC.
+    train_sampler = DistributedSampler(train_dataset, shuffle=True) if distributed else None
+    # Validation shards are strided, not padded like DistributedSampler's,
+    # so no example is counted twice when validate() sums the ranks
+    val_sampler = range(dist.get_rank(), len(val_dataset), world_size) if distributed else None
+    loader_kwargs = dict(
+        batch_size=8,
+        pin_memory=torch.cuda.is_available(),
+    )
+    # drop_last keeps every training batch the same shape, so the compiled
+    # model captures a single graph, but only when every rank has a full
+    # batch to keep (DistributedSampler gives all ranks the same count)
+    rank_train_size = len(train_sampler) if train_sampler is not None else len(train_dataset)
+    train_loader = DataLoader(
+        train_dataset, shuffle=train_sampler is None, sampler=train_sampler,
+        drop_last=rank_train_size >= loader_kwargs['batch_size'], **loader_kwargs
+    )
+    val_loader = DataLoader(val_dataset, shuffle=False, sampler=val_sampler, **loader_kwargs)
     
     # Model
     input_dim = dataset.get_feature_dim()
+    num_languages = dataset.get_num_languages()
     print(f"\n🧠 Model architecture:")
-    print(f"   Input dim: {input_dim}")
+    print(f"   Input dim: {input_dim} (+ {CatastropheClassifier.LANGUAGE_DIM}-d embedding of {num_languages} languages)")
     print(f"   Encoder: 256 → 128 → 64")
     print(f"   Heads: Classification (binary) + Regression (severity)")
     
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f"   Device: {device}")
+    if torch.cuda.is_available():
+        device = torch.device('cuda', local_rank)
+    else:
+        device = torch.device('cpu')
+    print(f"   Device: {device}" + (f" (x{world_size} ranks)" if distributed else ""))
+    
+    # TF32 tensor cores for any matmul left in FP32 (Ampere+; ignored
+    # elsewhere). Shapes are static, so let cuDNN pick its fastest kernels.
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    torch.backends.cudnn.benchmark = True
+    torch.set_float32_matmul_precision('high')
+    
+    model = CatastropheClassifier(input_dim, num_languages).to(device)
+    if distributed:
+        # Gradients are all-reduced in 25MB buckets, overlapped with backward
+        model = DDP(
+            model,
+            device_ids=[local_rank] if device.type == 'cuda' else None,
+            bucket_cap_mb=25,
+        )
+    
+    # Compile the MLP into fused kernels (CUDA, PyTorch 2.0+); eager otherwise
+    model = compile_model(model, input_dim, loader_kwargs['batch_size'], device)
+    # Fused Adam updates all parameters in one kernel on GPU
+    optimizer = optim.Adam(model.parameters(), lr=0.001, fused=device.type == 'cuda')
     
-    model = CatastropheClassifier(input_dim).to(device)
-    optimizer = optim.Adam(model.parameters(), lr=0.001)
+    # Mixed precision: bf16 needs no loss scaling, fp16 does
+    dtype = amp_dtype(device)
+    scaler = torch.cuda.amp.GradScaler(enabled=dtype == torch.float16)
+    print(f"   Precision: {dtype or torch.float32}")
     
     # Training loop
     num_epochs = 50
@@ -227,9 +463,11 @@ def main():
     
     for epoch in range(num_epochs):
         print(f"Epoch {epoch+1}/{num_epochs}")
+        if train_sampler is not None:
+            train_sampler.set_epoch(epoch)  # Reshuffle shards each epoch
         
         # Train
-        train_loss, train_acc = train_epoch(model, train_loader, optimizer, device)
+        train_loss, train_acc = train_epoch(model, train_loader, optimizer, device, scaler)
         
         # Validate
         val_loss, val_acc, preds, labels, ids = validate(model, val_loader, device)
@@ -243,12 +481,14 @@ def main():
         print(f"  Train Loss: {train_loss:.4f}, Acc: {train_acc:.4f}")
         print(f"  Val Loss: {val_loss:.4f}, Acc: {val_acc:.4f}")
         
-        # Save best model
+        # Save best model (unwrapped, so the checkpoint loads into a plain
+        # CatastropheClassifier)
         if val_acc > best_val_acc:
             best_val_acc = val_acc
-            model_path = Path(__file__).parent.parent / "models" / "catastrophe_detector.pth"
-            model_path.parent.mkdir(exist_ok=True)
-            torch.save(model.state_dict(), model_path)
+            if is_main_process():
+                model_path = Path(__file__).parent.parent / "models" / "catastrophe_detector.pth"
+                model_path.parent.mkdir(exist_ok=True)
+                torch.save(unwrap_model(model).state_dict(), model_path)
             print(f"  ✅ Saved best model (acc: {best_val_acc:.4f})")
         
         print()
@@ -261,12 +501,19 @@ def main():
     print(f"Final train accuracy: {history['train_acc'][-1]:.4f}")
     print(f"Final validation accuracy: {history['val_acc'][-1]:.4f}")
     
-    # Save history
-    history_path = Path(__file__).parent.parent / "models" / "training_history.json"
-    with open(history_path, 'w') as f:
-        json.dump(history, f, indent=2)
+    # Save history, and an int8 copy of the best model for CPU inference
+    models_dir = Path(__file__).parent.parent / "models"
+    if is_main_process():
+        history_path = models_dir / "training_history.json"
+        with open(history_path, 'w') as f:
+            json.dump(history, f, indent=2)
+        
+        model_path = models_dir / "catastrophe_detector.pth"
+        if model_path.exists():
+            save_int8_checkpoint(model_path, input_dim, num_languages, models_dir / "catastrophe_detector_int8.pth")
     
     print(f"\n💾 Model saved to: models/catastrophe_detector.pth")
+    print("   CPU int8 copy: models/catastrophe_detector_int8.pth")
     print(f"📊 History saved to: models/training_history.json")
     
     # Analyze validation errors
@@ -274,17 +521,16 @@ def main():
     print("  VALIDATION ANALYSIS")
     print("=" * 70)
     
-    _, _, preds, labels, ids = validate(model, val_loader, device)
+    # The last epoch already validated the final model; reuse its outputs
+    preds = np.asarray(preds, dtype=np.float32).reshape(-1)
+    true_class = np.asarray(labels).reshape(-1).astype(int)
+    pred_class = (preds > 0.5).astype(int)
     
     # Find misclassifications
-    for i, (pred, label, ex_id) in enumerate(zip(preds, labels, ids)):
-        pred_class = 1 if pred > 0.5 else 0
-        true_class = int(label)
-        
-        if pred_class != true_class:
-            print(f"\n❌ Misclassified: {ex_id}")
-            print(f"   Predicted: {'Catastrophic' if pred_class == 1 else 'Safe'} ({pred:.3f})")
-            print(f"   Actual: {'Catastrophic' if true_class == 1 else 'Safe'}")
+    for i in np.flatnonzero(pred_class != true_class):
+        print(f"\n❌ Misclassified: {ids[i]}")
+        print(f"   Predicted: {'Catastrophic' if pred_class[i] == 1 else 'Safe'} ({preds[i]:.3f})")
+        print(f"   Actual: {'Catastrophic' if true_class[i] == 1 else 'Safe'}")
     
     return 0
 
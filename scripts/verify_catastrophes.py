@@ -9,55 +9,84 @@ This script:
 4. Optionally updates the JSON with verified status
 """
 
+import io
 import json
 import sys
 import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 from datetime import datetime
 
 # Add src to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
-from training.types import CatastropheRecord, CatastropheType
+from training.types import CatastropheRecord
 from training.surgical_fetch import SurgicalFetcher, FetchConfig
 
+# ijson streams the catastrophe list for the read-only pass; fall back to
+# loading the whole file when it isn't installed.
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
 
-def load_all_catastrophes() -> tuple[list, dict]:
-    """Load all catastrophes from JSON, return both parsed records and raw data."""
-    json_path = Path(__file__).parent.parent / "data" / "verified_catastrophes.json"
-    
-    with open(json_path) as f:
-        data = json.load(f)
+# orjson reads and writes JSON much faster than the stdlib json module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _load_json(path: Path):
+    """Read a JSON file, via orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(path.read_bytes())
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(obj, path: Path):
+    """Write obj to path as 2-space indented JSON."""
+    if ORJSON_AVAILABLE:
+        path.write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
+CATASTROPHES_PATH = Path(__file__).parent.parent / "data" / "verified_catastrophes.json"
+
+
+def _iter_catastrophes(json_path: Path):
+    """Yield entries of the top-level `catastrophes` array one at a time."""
+    if IJSON_AVAILABLE:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'catastrophes.item', use_float=True)
+    else:
+        yield from _load_json(json_path).get("catastrophes", [])
+
+
+def load_all_catastrophes() -> list:
+    """
+    Load all catastrophes with a usable fix commit as records.
     
+    Streams the file; the raw document is only loaded (in main) when
+    there are results to write back.
+    """
     records = []
-    for cat in data.get("catastrophes", []):
+    for cat in _iter_catastrophes(CATASTROPHES_PATH):
         # Skip entries with obvious placeholder commits
         if not cat.get("fixing_commits") or "tried several" in str(cat.get("fixing_commits", [])):
             print(f"  ⏭️  Skipping {cat['id']} - no valid fix commit")
             continue
-            
-        record = CatastropheRecord(
-            id=cat["id"],
-            name=cat["name"],
-            cve=cat.get("cve"),
-            repo_url=cat["repo_url"],
-            breaking_commits=cat.get("breaking_commits", []),
-            fixing_commits=cat.get("fixing_commits", []),
-            catastrophe_type=CatastropheType(cat.get("catastrophe_type", "sudden")),
-            is_systemic=cat.get("is_systemic", False),
-            latency_years=cat.get("latency_years"),
-            language=cat.get("language", "c"),
-            affected_files=cat.get("affected_files", []),
-            severity_score=cat.get("severity_score", 5),
-            deaths=cat.get("deaths", 0),
-            financial_loss_usd=cat.get("financial_loss_usd", 0),
-            year=cat.get("year", 2020),
-            description=cat.get("description", ""),
-            verified=cat.get("verified", False),
-        )
-        records.append(record)
-    
-    return records, data
+        
+        records.append(CatastropheRecord.from_dict(cat))
+    
+    return records
 
 
 def verify_catastrophe(record: CatastropheRecord, fetcher: SurgicalFetcher) -> dict:
@@ -91,15 +120,16 @@ def verify_catastrophe(record: CatastropheRecord, fetcher: SurgicalFetcher) -> d
         work_dir = Path(temp_dir)
         
         try:
-            # Fetch the commit window
-            repo_dir, windows = fetcher.fetch_catastrophe_window(record, work_dir)
+            # Fetch the commit windows; only the first is checked, so stop
+            # fetching once it arrives
+            repo_dir, windows = fetcher.stream_catastrophe_windows(record, work_dir)
+            window = next(windows, None)
+            windows.close()
             
-            if not windows:
+            if window is None:
                 result["error"] = "No commit windows returned"
                 print(f"  ❌ {result['error']}")
                 return result
-            
-            window = windows[0]
             result["ancestors"] = len(window.ancestors)
             result["descendants"] = len(window.descendants)
             
@@ -125,6 +155,23 @@ def verify_catastrophe(record: CatastropheRecord, fetcher: SurgicalFetcher) -> d
     return result
 
 
+def verify_in_worker(record: CatastropheRecord, config: FetchConfig) -> tuple:
+    """
+    Run verify_catastrophe in a worker process with its own fetcher.
+    
+    The worker's output (including the fetcher's progress) is buffered and
+    handed back, so the parent can print each record's block whole instead
+    of interleaving lines from concurrent fetches.
+    
+    Returns:
+        (result dict, captured output)
+    """
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out), SurgicalFetcher(config) as fetcher:
+        result = verify_catastrophe(record, fetcher)
+    return result, out.getvalue()
+
+
 def main():
     print("=" * 60)
     print("  DarkSeer Catastrophe Verification")
@@ -132,7 +179,7 @@ def main():
     print(f"  Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Load all catastrophes
-    records, raw_data = load_all_catastrophes()
+    records = load_all_catastrophes()
     print(f"\nLoaded {len(records)} catastrophes to verify")
     
     # Configure fetcher with modest settings
@@ -140,14 +187,16 @@ def main():
         ancestors_count=3,   # Just need to verify commit exists
         descendants_count=2,
         skip_verification_check=True,  # We're verifying, so bypass the check
+        fetch_workers=1,     # Only the first window is checked
     )
-    fetcher = SurgicalFetcher(config)
     
-    # Verify each
+    # Verify in parallel: each check is a network-bound git fetch into its
+    # own temp dir. Results (and their output) come back in input order.
     results = []
-    for record in records:
-        result = verify_catastrophe(record, fetcher)
-        results.append(result)
+    with ProcessPoolExecutor(max_workers=8) as executor:
+        for result, output in executor.map(verify_in_worker, records, repeat(config)):
+            print(output, end="")
+            results.append(result)
     
     # Summary
     print("\n" + "=" * 60)
@@ -174,19 +223,18 @@ def main():
         print("Updating verified_catastrophes.json...")
         
         if True:  # Always update
-            # Update the raw data
+            # Update the raw data (read in full only now, to rewrite it)
+            raw_data = _load_json(CATASTROPHES_PATH)
+            verified_by_id = {r["id"]: r for r in verified}
             for cat in raw_data.get("catastrophes", []):
-                for r in verified:
-                    if cat["id"] == r["id"]:
-                        cat["verified"] = True
-                        cat["verification_notes"] = f"Verified via surgical fetch on {datetime.now().strftime('%Y-%m-%d')}. {r['ancestors']} ancestors found."
-                        break
+                r = verified_by_id.get(cat["id"])
+                if r is not None:
+                    cat["verified"] = True
+                    cat["verification_notes"] = f"Verified via surgical fetch on {datetime.now().strftime('%Y-%m-%d')}. {r['ancestors']} ancestors found."
             
             raw_data["last_verified"] = datetime.now().strftime("%Y-%m-%d")
             
-            json_path = Path(__file__).parent.parent / "data" / "verified_catastrophes.json"
-            with open(json_path, 'w') as f:
-                json.dump(raw_data, f, indent=2)
+            _write_json(raw_data, CATASTROPHES_PATH)
             
             print("  ✓ Updated verified_catastrophes.json")
     
@@ -4,29 +4,65 @@ DarkSeer Catastrophe Detector
 The core detection engine that uses ArchIdx to identify catastrophic code changes.
 """
 
+from __future__ import annotations
+
+import io
 import sys
+import functools
+from itertools import chain
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 from dataclasses import dataclass
 
-# Add ArchIdx to path (submodule)
-ARCHIDX_PATH = Path(__file__).parent.parent.parent / "archidx" / "src"
-if ARCHIDX_PATH.exists():
-    sys.path.insert(0, str(ARCHIDX_PATH))
-else:
-    # Fallback to sibling directory during development
-    ARCHIDX_PATH = Path(__file__).parent.parent.parent.parent / "ArchIdx" / "src"
-    if ARCHIDX_PATH.exists():
-        sys.path.insert(0, str(ARCHIDX_PATH))
+import numpy as np
+
+if TYPE_CHECKING:
+    from arch_packet.ast_invariant_detector import DetectedInvariant
+
+# ArchIdx locations: the submodule, then a sibling checkout during development
+ARCHIDX_PATHS = (
+    Path(__file__).parent.parent.parent / "archidx" / "src",
+    Path(__file__).parent.parent.parent.parent / "ArchIdx" / "src",
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_archidx():
+    """
+    Import ArchIdx on first use, so importing this module stays cheap.
+    
+    Returns:
+        (ArchPacketGenerator, ASTInvariantDetector), or None if ArchIdx
+        isn't available
+    """
+    archidx_path = next((p for p in ARCHIDX_PATHS if p.exists()), ARCHIDX_PATHS[-1])
+    if archidx_path.exists():
+        sys.path.insert(0, str(archidx_path))
+    
+    try:
+        from arch_packet.generator import ArchPacketGenerator
+        from arch_packet.ast_invariant_detector import ASTInvariantDetector
+    except ImportError as e:
+        print(f"⚠️  ArchIdx not available: {e}")
+        print(f"   Looked in: {archidx_path}")
+        return None
+    return ArchPacketGenerator, ASTInvariantDetector
 
+# pyahocorasick matches all dangerous ops in one pass over the code;
+# without it, fall back to one substring search per op.
 try:
-    from arch_packet.generator import ArchPacketGenerator
-    from arch_packet.ast_invariant_detector import ASTInvariantDetector, DetectedInvariant
-    ARCHIDX_AVAILABLE = True
-except ImportError as e:
-    print(f"⚠️  ArchIdx not available: {e}")
-    print(f"   Looked in: {ARCHIDX_PATH}")
-    ARCHIDX_AVAILABLE = False
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# Fields read off a DetectedInvariant for serialization, in one call
+_INV_FIELDS = attrgetter(
+    'invariant_type', 'severity', 'description',
+    'line_start', 'line_end', 'protected_operation',
+)
 
 
 @dataclass
@@ -59,11 +95,15 @@ class CatastropheDetector:
     
     Usage:
         detector = CatastropheDetector()
+        detector.warmup(["c"])  # optional: prime parsers before a batch
         result = detector.analyze_change(before_code, after_code, language="c")
         
         if result.is_catastrophic:
             print(f"🚨 CRITICAL: {result.summary}")
             print(f"Risk Score: {result.risk_score}/100")
+        
+        # Many changes: one vectorized scoring pass
+        results = detector.analyze_batch([(before, after, "c", "ssl/t1_lib.c"), ...])
     """
     
     def __init__(self, threshold: int = 70):
@@ -73,24 +113,80 @@ class CatastropheDetector:
         Args:
             threshold: Risk score threshold for catastrophic classification (0-100)
         """
-        if not ARCHIDX_AVAILABLE:
+        archidx = _load_archidx()
+        if archidx is None:
             raise RuntimeError("ArchIdx not available. Ensure it's installed or linked.")
+        ArchPacketGenerator, ASTInvariantDetector = archidx
         
         self.threshold = threshold
         self.invariant_detector = ASTInvariantDetector()
         self.packet_generator = ArchPacketGenerator()
         
-        # Dangerous operations that need protection
-        self.dangerous_ops = {
-            'c': ['memcpy', 'memmove', 'memset', 'strcpy', 'strncpy', 'sprintf', 
-                  'snprintf', 'read', 'write', 'recv', 'send', 'malloc', 'free'],
-            'python': ['eval', 'exec', 'pickle.loads', 'yaml.load', 'subprocess.call',
-                       'os.system', '__import__'],
-            'java': ['Runtime.exec', 'ProcessBuilder', 'ObjectInputStream', 
-                     'XMLDecoder', 'ScriptEngine.eval'],
-            'javascript': ['eval', 'Function', 'innerHTML', 'document.write',
-                          'child_process.exec'],
-        }
+        # Dangerous operations that need protection (shared, read-only table)
+        self.dangerous_ops = self.DANGEROUS_OPS
+        
+        # One matcher per language, built once and reused for every change
+        self._op_automata = {}
+        if AHOCORASICK_AVAILABLE:
+            for language, ops in self.dangerous_ops.items():
+                automaton = ahocorasick.Automaton()
+                for op in ops:
+                    automaton.add_word(op, op)
+                automaton.make_automaton()
+                self._op_automata[language] = automaton
+    
+    # Dangerous operations per language. Tuples: immutable, and ordered so
+    # reported ops come out in a stable order.
+    DANGEROUS_OPS = {
+        'c': ('memcpy', 'memmove', 'memset', 'strcpy', 'strncpy', 'sprintf',
+              'snprintf', 'read', 'write', 'recv', 'send', 'malloc', 'free'),
+        'python': ('eval', 'exec', 'pickle.loads', 'yaml.load', 'subprocess.call',
+                   'os.system', '__import__'),
+        'java': ('Runtime.exec', 'ProcessBuilder', 'ObjectInputStream',
+                 'XMLDecoder', 'ScriptEngine.eval'),
+        'javascript': ('eval', 'Function', 'innerHTML', 'document.write',
+                       'child_process.exec'),
+    }
+    
+    # Invariant types that guard dangerous operations
+    PROTECTIVE_TYPES = frozenset({'bounds_checked', 'null_checked', 'input_validated'})
+    
+    # Risk score rules: (factor, points per unit, cap on the factor's points)
+    RISK_RULES = (
+        ('n_dangerous', 10, 30),        # Dangerous operations present
+        ('unprotected', 40, 40),        # ...with no protective invariants before
+        ('n_removed', 10, 20),          # Invariants removed (very bad)
+        ('protection_added', 10, 10),   # Change adds protection (it was missing)
+    )
+    MAX_RISK_SCORE = 100
+    
+    # Smallest valid program per language, used to prime parsers in warmup()
+    WARMUP_SNIPPETS = {
+        'c': "int f(void) { return 0; }\n",
+        'cpp': "int f() { return 0; }\n",
+        'python': "def f():\n    return 0\n",
+        'java': "class A { int f() { return 0; } }\n",
+        'javascript': "function f() { return 0; }\n",
+    }
+    
+    def warmup(self, languages: Iterable[str] = ("c",)):
+        """
+        Pay one-time parser setup for the given languages up front.
+        
+        ArchIdx builds its tree-sitter parser and rule tables for a language
+        on first use, so the first analyze_change() call per language is
+        much slower than the rest. Call this once before a batch (or a timed
+        demo) to move that cost out of the loop. Languages without a
+        snippet, or that ArchIdx can't parse, are skipped.
+        """
+        for language in languages:
+            snippet = self.WARMUP_SNIPPETS.get(language)
+            if snippet is None:
+                continue
+            try:
+                self.invariant_detector.detect_invariants(snippet, language, "warmup")
+            except Exception:
+                continue
     
     def analyze_change(
         self,
@@ -111,18 +207,10 @@ class CatastropheDetector:
         Returns:
             DetectionResult with risk assessment and explanation
         """
-        # Detect invariants in both versions
-        before_invs = self.invariant_detector.detect_invariants(before_code, language, file_path)
-        after_invs = self.invariant_detector.detect_invariants(after_code, language, file_path)
-        
-        # Compare
-        comparison = self.invariant_detector.compare_invariants(
+        before_invs, after_invs, comparison, dangerous = self._inspect(
             before_code, after_code, language, file_path
         )
         
-        # Find dangerous operations in the code
-        dangerous = self._find_dangerous_ops(before_code, after_code, language)
-        
         # Calculate risk score
         risk_score = self._calculate_risk_score(
             before_invs=before_invs,
@@ -132,6 +220,83 @@ class CatastropheDetector:
             dangerous_ops=dangerous,
         )
         
+        return self._build_result(
+            before_invs, after_invs, comparison, dangerous, risk_score, language, file_path
+        )
+    
+    def analyze_batch(
+        self,
+        changes: Iterable[Tuple[str, str, str, str]],
+    ) -> List[DetectionResult]:
+        """
+        Analyze many code changes at once.
+        
+        Invariant detection still runs per change, but the risk scores for
+        the whole batch are computed in one vectorized pass.
+        
+        Args:
+            changes: (before_code, after_code, language, file_path) tuples
+            
+        Returns:
+            One DetectionResult per change, in order
+        """
+        inspected = []
+        for before_code, after_code, language, file_path in changes:
+            parts = self._inspect(before_code, after_code, language, file_path)
+            inspected.append((parts, language, file_path))
+        if not inspected:
+            return []
+        
+        # Per-change risk factors as columns, scored with the same rule
+        # table as _calculate_risk_score, all rows at once
+        factors = [self._risk_factors(p[0], p[2]['added'], p[2]['removed'], p[3])
+                   for p, _, _ in inspected]
+        columns = {name: np.array([f[name] for f in factors]) for name in factors[0]}
+        scores = self._apply_risk_rules(columns).tolist()
+        
+        return [
+            self._build_result(*parts, score, language, file_path)
+            for (parts, language, file_path), score in zip(inspected, scores)
+        ]
+    
+    def _inspect(
+        self,
+        before_code: str,
+        after_code: str,
+        language: str,
+        file_path: str,
+    ) -> tuple:
+        """
+        Detect invariants and dangerous operations for one change.
+        
+        Returns:
+            (before_invs, after_invs, {'added', 'removed'}, dangerous_ops)
+        """
+        # Detect invariants in both versions
+        before_invs = self.invariant_detector.detect_invariants(before_code, language, file_path)
+        after_invs = self.invariant_detector.detect_invariants(after_code, language, file_path)
+        
+        # Compare
+        comparison = self.invariant_detector.compare_invariants(
+            before_code, after_code, language, file_path
+        )
+        
+        # Find dangerous operations in the code
+        dangerous = self._find_dangerous_ops(before_code, after_code, language)
+        
+        return before_invs, after_invs, comparison, dangerous
+    
+    def _build_result(
+        self,
+        before_invs: List[DetectedInvariant],
+        after_invs: List[DetectedInvariant],
+        comparison: Dict[str, List[DetectedInvariant]],
+        dangerous: List[str],
+        risk_score: int,
+        language: str,
+        file_path: str,
+    ) -> DetectionResult:
+        """Explain a scored change and package it as a DetectionResult."""
         # Generate explanation
         summary, detailed = self._generate_explanation(
             before_invs=before_invs,
@@ -142,13 +307,20 @@ class CatastropheDetector:
             risk_score=risk_score,
         )
         
+        # Serialize each invariant once; added/removed reuse those dicts
+        # when ArchIdx hands back the same objects
+        as_dict = {id(i): self._inv_to_dict(i) for i in chain(before_invs, after_invs)}
+        
+        def to_dicts(invs):
+            return [as_dict.get(id(i)) or self._inv_to_dict(i) for i in invs]
+        
         return DetectionResult(
             risk_score=risk_score,
             is_catastrophic=risk_score >= self.threshold,
-            invariants_before=[self._inv_to_dict(i) for i in before_invs],
-            invariants_after=[self._inv_to_dict(i) for i in after_invs],
-            invariants_added=[self._inv_to_dict(i) for i in comparison['added']],
-            invariants_removed=[self._inv_to_dict(i) for i in comparison['removed']],
+            invariants_before=to_dicts(before_invs),
+            invariants_after=to_dicts(after_invs),
+            invariants_added=to_dicts(comparison['added']),
+            invariants_removed=to_dicts(comparison['removed']),
             dangerous_ops=dangerous,
             summary=summary,
             detailed_explanation=detailed,
@@ -175,14 +347,16 @@ class CatastropheDetector:
         added_lines = []
         removed_lines = []
         
-        for line in diff_text.split('\n'):
+        # Stream the lines (keeping their '\n') instead of splitting the whole
+        # diff into a list first; each side is then joined in one allocation
+        for line in io.StringIO(diff_text, newline='\n'):
             if line.startswith('+') and not line.startswith('+++'):
                 added_lines.append(line[1:])
             elif line.startswith('-') and not line.startswith('---'):
                 removed_lines.append(line[1:])
         
-        before_code = '\n'.join(removed_lines)
-        after_code = '\n'.join(added_lines)
+        before_code = ''.join(removed_lines)
+        after_code = ''.join(added_lines)
         
         return self.analyze_change(before_code, after_code, language, "diff")
     
@@ -192,17 +366,21 @@ class CatastropheDetector:
         after_code: str,
         language: str,
     ) -> List[str]:
-        """Find dangerous operations in the code."""
-        ops = self.dangerous_ops.get(language, [])
-        found = []
+        """
+        Find dangerous operations in the code.
         
-        combined_code = before_code + after_code
+        Each side is scanned on its own (no before + after copy, and no
+        false match straddling the join). Results keep the order of the
+        language's op table.
+        """
+        ops = self.dangerous_ops.get(language, ())
         
-        for op in ops:
-            if op in combined_code:
-                found.append(op)
+        automaton = self._op_automata.get(language)
+        if automaton is not None:
+            hits = {op for code in (before_code, after_code) for _, op in automaton.iter(code)}
+            return [op for op in ops if op in hits]
         
-        return found
+        return [op for op in ops if op in before_code or op in after_code]
     
     def _calculate_risk_score(
         self,
@@ -221,33 +399,44 @@ class CatastropheDetector:
         - Invariants removed by change
         - Severity of affected invariants
         """
-        score = 0
-        
-        # Dangerous operations present (+30)
-        if dangerous_ops:
-            score += min(30, len(dangerous_ops) * 10)
-        
-        # No protective invariants in before code (+40)
-        protective_types = {'bounds_checked', 'null_checked', 'input_validated'}
+        factors = self._risk_factors(before_invs, added, removed, dangerous_ops)
+        return int(self._apply_risk_rules(factors))
+    
+    def _risk_factors(
+        self,
+        before_invs: List[DetectedInvariant],
+        added: List[DetectedInvariant],
+        removed: List[DetectedInvariant],
+        dangerous_ops: List[str],
+    ) -> Dict[str, int]:
+        """Count the inputs RISK_RULES scores for one change."""
+        protective_types = self.PROTECTIVE_TYPES
         before_has_protection = any(
             i.invariant_type.value in protective_types for i in before_invs
         )
-        
-        if dangerous_ops and not before_has_protection:
-            score += 40
-        
-        # Invariants removed (very bad) (+20)
-        if removed:
-            score += min(20, len(removed) * 10)
-        
-        # Change adds protection (indicates it was missing) (+10)
         protection_added = any(
             i.invariant_type.value in protective_types for i in added
         )
-        if protection_added:
-            score += 10
+        return {
+            'n_dangerous': len(dangerous_ops),
+            'unprotected': bool(dangerous_ops) and not before_has_protection,
+            'n_removed': len(removed),
+            'protection_added': protection_added,
+        }
+    
+    @classmethod
+    def _apply_risk_rules(cls, factors):
+        """
+        Score risk factors with RISK_RULES.
         
-        return min(100, score)
+        Works on one change's factors (ints/bools) or on NumPy columns
+        holding a whole batch, so both paths share the same rules.
+        """
+        score = sum(
+            np.minimum(cap, factors[name] * points)
+            for name, points, cap in cls.RISK_RULES
+        )
+        return np.minimum(cls.MAX_RISK_SCORE, score)
     
     def _generate_explanation(
         self,
@@ -299,12 +488,13 @@ class CatastropheDetector:
     
     def _inv_to_dict(self, inv: DetectedInvariant) -> Dict:
         """Convert invariant to dictionary."""
+        inv_type, severity, description, line_start, line_end, protected = _INV_FIELDS(inv)
         return {
-            "type": inv.invariant_type.value,
-            "severity": inv.severity.value,
-            "description": inv.description,
-            "line_start": inv.line_start,
-            "line_end": inv.line_end,
-            "protected_operation": inv.protected_operation,
+            "type": inv_type.value,
+            "severity": severity.value,
+            "description": description,
+            "line_start": line_start,
+            "line_end": line_end,
+            "protected_operation": protected,
         }
 
@@ -9,9 +9,11 @@ Calculates risk scores based on multiple factors:
 """
 
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from enum import Enum
 
+import numpy as np
+
 
 class RiskCategory(str, Enum):
     """Categories of risk."""
@@ -22,6 +24,37 @@ class RiskCategory(str, Enum):
     DATA_INTEGRITY = "data"         # Data corruption
 
 
+# Domains that map to non-security risk categories
+_SAFETY_DOMAINS = frozenset({"medical", "automotive", "aviation"})
+_FINANCIAL_DOMAINS = frozenset({"financial"})
+
+# Mitigations, one bit per rule; bit order is the order they are suggested in
+_MITIGATION_BY_BIT: Dict[int, Tuple[str, ...]] = {
+    1: ("Add bounds checking before memory operations",
+        "Validate input lengths before use"),
+    2: ("Add null checks before pointer dereference",),
+    4: ("Sanitize and validate all user input",
+        "Use parameterized queries for database operations"),
+    8: ("Require authentication before this operation",),
+    16: ("Check user permissions before accessing resource",),
+    32: ("Use safe string functions (strncpy, memcpy_s)",),
+    64: ("Avoid eval/exec; use safer alternatives",),
+}
+_INV_BITS: Dict[str, int] = {
+    "bounds_checked": 1,
+    "null_checked": 2,
+    "input_validated": 4,
+    "authenticated": 8,
+    "authorized": 16,
+}
+_OP_BITS: Dict[str, int] = {
+    "memcpy": 32,
+    "strcpy": 32,
+    "eval": 64,
+    "exec": 64,
+}
+
+
 @dataclass
 class RiskAssessment:
     """Detailed risk assessment."""
@@ -71,6 +104,16 @@ class RiskScorer:
             "infrastructure": 1.4,
             "general": 1.0,
         }
+        
+        # Factor names for known invariants, built once
+        self._missing_keys = {inv: f"missing_{inv}" for inv in self.invariant_weights}
+        
+        # Weight vector for batch scoring: one column per known invariant,
+        # plus a final column for unknown ones (default weight 10)
+        self._inv_index = {inv: i for i, inv in enumerate(self.invariant_weights)}
+        self._inv_weights = np.array(
+            [*self.invariant_weights.values(), 10], dtype=np.float64
+        )
     
     def calculate(
         self,
@@ -95,9 +138,10 @@ class RiskScorer:
         base_score = 0
         
         # Score for missing invariants
+        missing_keys = self._missing_keys
         for inv in missing_invariants:
             weight = self.invariant_weights.get(inv, 10)
-            factors[f"missing_{inv}"] = weight
+            factors[missing_keys.get(inv) or f"missing_{inv}"] = weight
             base_score += weight
         
         # Score for dangerous operations
@@ -110,10 +154,78 @@ class RiskScorer:
         multiplier = self.domain_multipliers.get(domain, 1.0)
         final_score = min(100, int(base_score * multiplier))
         
+        return self._build_assessment(
+            final_score, factors, missing_invariants, dangerous_operations, domain
+        )
+    
+    def calculate_batch(
+        self,
+        missing_invariants_list: Sequence[List[str]],
+        dangerous_operations_list: Sequence[List[str]],
+        domains: Optional[Iterable[str]] = None,
+    ) -> List[RiskAssessment]:
+        """
+        Calculate risk assessments for many findings at once.
+        
+        Scores for the whole batch are computed in one vectorized pass;
+        results match calling calculate() on each finding.
+        
+        Args:
+            missing_invariants_list: Missing invariant types, one list per finding
+            dangerous_operations_list: Dangerous operations, one list per finding
+            domains: Domain per finding (default: "general" for all)
+            
+        Returns:
+            One RiskAssessment per finding, in order
+        """
+        n = len(missing_invariants_list)
+        if n == 0:
+            return []
+        domains = ["general"] * n if domains is None else list(domains)
+        
+        # Invariant occurrence counts per finding (repeats score repeatedly,
+        # as in calculate), with unknown invariants in the last column
+        unknown = len(self._inv_weights) - 1
+        counts = np.zeros((n, unknown + 1), dtype=np.float64)
+        for row, missing in enumerate(missing_invariants_list):
+            for inv in missing:
+                counts[row, self._inv_index.get(inv, unknown)] += 1
+        
+        n_dangerous = np.array([len(ops) for ops in dangerous_operations_list])
+        multipliers = np.array(
+            [self.domain_multipliers.get(d, 1.0) for d in domains], dtype=np.float64
+        )
+        
+        base_scores = counts @ self._inv_weights + np.minimum(30, n_dangerous * 10)
+        scores = np.minimum(100, (base_scores * multipliers).astype(np.int64)).tolist()
+        
+        missing_keys = self._missing_keys
+        results = []
+        for missing, ops, domain, score in zip(
+            missing_invariants_list, dangerous_operations_list, domains, scores
+        ):
+            factors = {
+                missing_keys.get(inv) or f"missing_{inv}": self.invariant_weights.get(inv, 10)
+                for inv in missing
+            }
+            if ops:
+                factors["dangerous_operations"] = min(30, len(ops) * 10)
+            results.append(self._build_assessment(score, factors, missing, ops, domain))
+        return results
+    
+    def _build_assessment(
+        self,
+        final_score: int,
+        factors: Dict[str, int],
+        missing_invariants: List[str],
+        dangerous_operations: List[str],
+        domain: str,
+    ) -> RiskAssessment:
+        """Derive category, blast radius and mitigations for a final score."""
         # Determine category
-        if domain in ["medical", "automotive", "aviation"]:
+        if domain in _SAFETY_DOMAINS:
             category = RiskCategory.SAFETY
-        elif domain in ["financial"]:
+        elif domain in _FINANCIAL_DOMAINS:
             category = RiskCategory.FINANCIAL
         else:
             category = RiskCategory.SECURITY
@@ -145,30 +257,17 @@ class RiskScorer:
         dangerous_operations: List[str],
     ) -> List[str]:
         """Suggest mitigations based on findings."""
-        mitigations = []
-        
-        if "bounds_checked" in missing_invariants:
-            mitigations.append("Add bounds checking before memory operations")
-            mitigations.append("Validate input lengths before use")
-        
-        if "null_checked" in missing_invariants:
-            mitigations.append("Add null checks before pointer dereference")
-        
-        if "input_validated" in missing_invariants:
-            mitigations.append("Sanitize and validate all user input")
-            mitigations.append("Use parameterized queries for database operations")
-        
-        if "authenticated" in missing_invariants:
-            mitigations.append("Require authentication before this operation")
-        
-        if "authorized" in missing_invariants:
-            mitigations.append("Check user permissions before accessing resource")
-        
-        if "memcpy" in dangerous_operations or "strcpy" in dangerous_operations:
-            mitigations.append("Use safe string functions (strncpy, memcpy_s)")
+        bits = 0
+        for inv in missing_invariants:
+            bits |= _INV_BITS.get(inv, 0)
+        for op in dangerous_operations:
+            bits |= _OP_BITS.get(op, 0)
         
-        if "eval" in dangerous_operations or "exec" in dangerous_operations:
-            mitigations.append("Avoid eval/exec; use safer alternatives")
+        # Walk set bits lowest first
+        mitigations = []
+        while bits:
+            lsb = bits & -bits
+            mitigations.extend(_MITIGATION_BY_BIT[lsb])
+            bits ^= lsb
         
         return mitigations
-
@@ -1,11 +1,27 @@
 # DarkSeer Training Module
+#
+# Names are imported from their submodules on first access (PEP 562), so
+# e.g. using the record types doesn't pull in torch or ArchIdx.
 
-from .types import CatastropheRecord, CatastropheType, CommitWindow
-from .types import TrainingExample as TrainingExampleNew
-from .data_collector import CatastropheDataCollector
-from .dataset import DarkSeerDataset, TrainingExample, load_catastrophes, load_safe_commits
-from .component_aware_collector import ComponentAwareCollector, SafeCommit
-from .surgical_fetch import SurgicalFetcher, FetchConfig
+import importlib
+
+# Public name -> (submodule, attribute)
+_EXPORTS = {
+    "CatastropheRecord": (".types", "CatastropheRecord"),
+    "CatastropheType": (".types", "CatastropheType"),
+    "CommitWindow": (".types", "CommitWindow"),
+    "TrainingExampleNew": (".types", "TrainingExample"),
+    "CatastropheDataCollector": (".data_collector", "CatastropheDataCollector"),
+    "DarkSeerDataset": (".dataset", "DarkSeerDataset"),
+    "TrainingExample": (".dataset", "TrainingExample"),
+    "load_catastrophes": (".dataset", "load_catastrophes"),
+    "load_safe_commits": (".dataset", "load_safe_commits"),
+    "ComponentAwareCollector": (".component_aware_collector", "ComponentAwareCollector"),
+    "SafeCommit": (".component_aware_collector", "SafeCommit"),
+    "SurgicalFetcher": (".surgical_fetch", "SurgicalFetcher"),
+    "FetchConfig": (".surgical_fetch", "FetchConfig"),
+    "CommitView": (".surgical_fetch", "CommitView"),
+}
 
 __all__ = [
     "CatastropheRecord",
@@ -18,7 +34,21 @@ __all__ = [
     "SafeCommit",
     "SurgicalFetcher",
     "FetchConfig",
+    "CommitView",
     "load_catastrophes",
     "load_safe_commits",
 ]
 
+
+def __getattr__(name):
+    try:
+        module_name, attr = _EXPORTS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -2,18 +2,64 @@
 Catastrophe Data Collector
 
 Fetches real catastrophe examples from git repos and processes them for training.
-All repos are cloned to temp directories and cleaned up automatically.
+Repos are cloned to temp directories and cleaned up automatically, unless a
+clone cache directory is given.
 """
 
+import hashlib
 import json
+import os
+import random
 import subprocess
 import tempfile
 import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass, asdict
 from tqdm import tqdm
 
+# orjson serializes the dataclasses natively and much faster than json.dumps
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+from .component_aware_collector import BlobReader
+
+# Overall time budget (seconds) for the git commands of one fetch_from_git
+FETCH_DEADLINE = 300
+
+# File extension -> language
+_LANG_MAP = {
+    '.c': 'c',
+    '.h': 'c',
+    '.cpp': 'cpp',
+    '.cc': 'cpp',
+    '.cxx': 'cpp',
+    '.hpp': 'cpp',
+    '.java': 'java',
+    '.py': 'python',
+    '.js': 'javascript',
+    '.ts': 'typescript',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.rb': 'ruby',
+}
+
+
+def _dumps(obj) -> bytes:
+    """Serialize obj (a dict or dataclass) as compact JSON bytes."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    if not isinstance(obj, dict):
+        obj = asdict(obj)
+    return json.dumps(obj).encode()
+
 
 @dataclass
 class CatastropheExample:
@@ -48,25 +94,87 @@ class CatastropheExample:
     description: str
 
 
+def _load_catastrophe_file(json_file: Path) -> Tuple[Optional[CatastropheExample], str]:
+    """
+    Load one catastrophe JSON file (module-level so it can run in a worker).
+    
+    Returns:
+        (example, "") if the file has code, else (None, message to print)
+    """
+    try:
+        with open(json_file) as f:
+            data = json.load(f)
+        
+        # Extract data
+        example = CatastropheExample(
+            id=data.get("id", json_file.stem),
+            name=data.get("name", "Unknown"),
+            cve=data.get("cve"),
+            
+            # Code (may be reconstructed for older incidents)
+            before_code=data.get("vulnerable_code", {}).get("code", ""),
+            after_code=data.get("fix_code", {}).get("code", ""),
+            language=data.get("language", "unknown"),
+            file_path=data.get("vulnerable_code", {}).get("file", "unknown"),
+            
+            # Commits
+            commit_introducing=data.get("vulnerable_code", {}).get("commit_introducing"),
+            commit_fixing=data.get("fix_code", {}).get("commit_fixing"),
+            
+            # Labels
+            category=data.get("labels", {}).get("category", "unknown"),
+            root_cause=data.get("labels", {}).get("root_cause", "unknown"),
+            complexity_score=data.get("labels", {}).get("complexity_score", 5),
+            
+            # Impact
+            deaths=data.get("labels", {}).get("deaths", 0),
+            financial_loss_usd=data.get("labels", {}).get("financial_loss_usd", 0),
+            affected_systems=data.get("labels", {}).get("affected_systems", 0),
+            
+            # Metadata
+            project=data.get("project", "Unknown"),
+            year=data.get("year", 0),
+            description=data.get("description", ""),
+        )
+        
+        # Only include if we have code
+        if example.before_code and example.after_code:
+            return example, ""
+        return None, f"   ⚠️  Skipping {json_file.name}: no code available"
+        
+    except Exception as e:
+        return None, f"   ❌ Error loading {json_file.name}: {e}"
+
+
 class CatastropheDataCollector:
     """
     Collects catastrophe examples for training.
     
-    Uses temporary directories for all repo operations - nothing is stored permanently.
+    Uses temporary directories for repo operations - nothing is stored
+    permanently unless cache_dir is set.
     """
     
-    def __init__(self, output_dir: Path):
+    def __init__(self, output_dir: Path, cache_dir: Optional[Path] = None):
         """
         Initialize collector.
         
         Args:
             output_dir: Where to save processed training data (NOT repos)
+            cache_dir: Keep clones here (one per repo URL) and reuse them
+                       across calls and runs. Clones go to temp dirs if None.
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
         
         # Will be cleaned up automatically
         self.temp_dir = None
+        
+        # Keeps lines from fetches run on several threads whole
+        self._print_lock = threading.Lock()
+        
+        # One fetch at a time into each cached clone
+        self._repo_locks = defaultdict(threading.Lock)
     
     def collect_from_catastrophe_files(
         self,
@@ -92,51 +200,16 @@ class CatastropheDataCollector:
         
         print(f"📂 Found {len(json_files)} catastrophe files")
         
-        for json_file in tqdm(json_files, desc="Loading catastrophes"):
-            try:
-                with open(json_file) as f:
-                    data = json.load(f)
-                
-                # Extract data
-                example = CatastropheExample(
-                    id=data.get("id", json_file.stem),
-                    name=data.get("name", "Unknown"),
-                    cve=data.get("cve"),
-                    
-                    # Code (may be reconstructed for older incidents)
-                    before_code=data.get("vulnerable_code", {}).get("code", ""),
-                    after_code=data.get("fix_code", {}).get("code", ""),
-                    language=data.get("language", "unknown"),
-                    file_path=data.get("vulnerable_code", {}).get("file", "unknown"),
-                    
-                    # Commits
-                    commit_introducing=data.get("vulnerable_code", {}).get("commit_introducing"),
-                    commit_fixing=data.get("fix_code", {}).get("commit_fixing"),
-                    
-                    # Labels
-                    category=data.get("labels", {}).get("category", "unknown"),
-                    root_cause=data.get("labels", {}).get("root_cause", "unknown"),
-                    complexity_score=data.get("labels", {}).get("complexity_score", 5),
-                    
-                    # Impact
-                    deaths=data.get("labels", {}).get("deaths", 0),
-                    financial_loss_usd=data.get("labels", {}).get("financial_loss_usd", 0),
-                    affected_systems=data.get("labels", {}).get("affected_systems", 0),
-                    
-                    # Metadata
-                    project=data.get("project", "Unknown"),
-                    year=data.get("year", 0),
-                    description=data.get("description", ""),
-                )
-                
-                # Only include if we have code
-                if example.before_code and example.after_code:
-                    examples.append(example)
-                else:
-                    print(f"   ⚠️  Skipping {json_file.name}: no code available")
-                    
-            except Exception as e:
-                print(f"   ❌ Error loading {json_file.name}: {e}")
+        # Parsing is CPU-bound, so files are spread over worker processes;
+        # messages come back with the results and are printed here, in order
+        if json_files:
+            with ProcessPoolExecutor() as executor:
+                results = executor.map(_load_catastrophe_file, json_files, chunksize=8)
+                for example, message in tqdm(results, total=len(json_files), desc="Loading catastrophes"):
+                    if example is not None:
+                        examples.append(example)
+                    else:
+                        print(message)
         
         print(f"✅ Loaded {len(examples)} catastrophe examples with code")
         return examples
@@ -151,7 +224,8 @@ class CatastropheDataCollector:
         """
         Fetch before/after code from a git commit.
         
-        Uses a temporary directory that is automatically cleaned up.
+        Uses a temporary directory that is automatically cleaned up, or
+        the repo's clone in cache_dir (fetching only if the commit is new).
         
         Args:
             repo_url: Git repository URL
@@ -164,44 +238,33 @@ class CatastropheDataCollector:
         """
         # Create temp directory for this repo
         with tempfile.TemporaryDirectory(prefix=f"darkseer_{project_name}_") as temp_dir:
-            temp_path = Path(temp_dir)
-            repo_dir = temp_path / "repo"
-            repo_dir.mkdir()
-            
-            print(f"   📥 Fetching {project_name} commit {commit_fixing[:8]}...")
-            
-            # Initialize repo
-            self._run_cmd(["git", "init"], cwd=repo_dir)
-            self._run_cmd(["git", "remote", "add", "origin", repo_url], cwd=repo_dir)
+            self._log(f"   📥 Fetching {project_name} commit {commit_fixing[:8]}...")
+            deadline = time.monotonic() + FETCH_DEADLINE
             
-            # Fetch just the commit we need
-            stdout, stderr, code = self._run_cmd(
-                ["git", "fetch", "--depth=2", "origin", commit_fixing],
-                cwd=repo_dir,
-                timeout=120,
-            )
+            if self.cache_dir is not None:
+                repo_dir = self.cache_dir / hashlib.sha1(repo_url.encode()).hexdigest()
+                with self._repo_locks[repo_dir]:
+                    error = self._fetch_commit(repo_url, commit_fixing, repo_dir, deadline=deadline)
+            else:
+                repo_dir = Path(temp_dir) / "repo"
+                error = self._fetch_commit(
+                    repo_url, commit_fixing, repo_dir, durable=False, deadline=deadline,
+                )
             
-            if code != 0:
-                print(f"      ⚠️  Could not fetch commit: {stderr[:100]}")
+            if error is not None:
+                self._log(f"      ⚠️  Could not fetch commit: {error[:100]}")
                 return None
             
-            # Checkout
-            self._run_cmd(["git", "checkout", commit_fixing], cwd=repo_dir)
-            
-            # Get file contents before and after
-            before_code = ""
-            after_code = ""
-            
-            for file_path in file_paths:
-                # After (fixed)
-                after = self._get_file_at_commit(repo_dir, commit_fixing, file_path)
-                if after:
-                    after_code += after + "\n\n"
-                
-                # Before (vulnerable)
-                before = self._get_file_before_commit(repo_dir, commit_fixing, file_path)
-                if before:
-                    before_code += before + "\n\n"
+            # Get file contents after (fixed) and before (vulnerable), all
+            # through one cat-file process
+            with BlobReader(repo_dir) as blobs:
+                contents = blobs.read_many([
+                    spec
+                    for file_path in file_paths
+                    for spec in (f"{commit_fixing}:{file_path}", f"{commit_fixing}^:{file_path}")
+                ])
+            after_code = "\n\n".join(after for after in contents[0::2] if after)
+            before_code = "\n\n".join(before for before in contents[1::2] if before)
             
             # Detect language from file extension
             language = self._detect_language(file_paths[0] if file_paths else "")
@@ -223,108 +286,160 @@ class CatastropheDataCollector:
         """
         output_path = self.output_dir / output_file
         
-        # Convert to serializable format
-        data = {
-            "num_examples": len(examples),
-            "categories": self._count_categories(examples),
-            "examples": [asdict(ex) for ex in examples],
-        }
+        # Tally everything the header and the statistics need in one pass
+        langs, cats, causes = Counter(), Counter(), Counter()
+        deaths = high_impact = 0
+        for e in examples:
+            langs[e.language] += 1
+            cats[e.category] += 1
+            causes[e.root_cause] += 1
+            deaths += e.deaths > 0
+            high_impact += e.financial_loss_usd >= 100000000
         
-        with open(output_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Written one example per line inside the "examples" array, so only a
+        # single serialized example is held in memory at a time and the file
+        # keeps the layout every reader (and the checked-in data) expects.
+        categories = _dumps(dict(cats))
+        with open(output_path, 'wb') as f:
+            f.write(b'{"num_examples": %d, "categories": %s, "examples": [\n'
+                    % (len(examples), categories))
+            for i, ex in enumerate(examples):
+                if i:
+                    f.write(b",\n")
+                f.write(_dumps(ex))
+            f.write(b"\n]}\n")
         
         print(f"💾 Saved {len(examples)} examples to {output_path}")
         
         # Print statistics
         print(f"\n📊 Dataset Statistics:")
         print(f"   Total examples: {len(examples)}")
-        print(f"   Languages: {self._count_field(examples, 'language')}")
-        print(f"   Categories: {self._count_field(examples, 'category')}")
-        print(f"   Root causes: {self._count_field(examples, 'root_cause')}")
-        print(f"   Death-causing: {sum(1 for e in examples if e.deaths > 0)}")
-        print(f"   High financial impact ($100M+): {sum(1 for e in examples if e.financial_loss_usd >= 100000000)}")
+        print(f"   Languages: {dict(langs)}")
+        print(f"   Categories: {dict(cats)}")
+        print(f"   Root causes: {dict(causes)}")
+        print(f"   Death-causing: {deaths}")
+        print(f"   High financial impact ($100M+): {high_impact}")
     
-    def _run_cmd(
+    def _fetch_commit(
         self,
-        cmd: List[str],
-        cwd: Path,
-        timeout: int = 60,
-    ) -> Tuple[str, str, int]:
-        """Run a command and return output."""
-        try:
-            result = subprocess.run(
-                cmd,
-                cwd=str(cwd),
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-            )
-            return result.stdout, result.stderr, result.returncode
-        except subprocess.TimeoutExpired:
-            return "", "Timeout", 1
-        except Exception as e:
-            return "", str(e), 1
-    
-    def _get_file_at_commit(
-        self,
-        repo_dir: Path,
+        repo_url: str,
         commit: str,
-        file_path: str,
+        repo_dir: Path,
+        durable: bool = True,
+        deadline: Optional[float] = None,
     ) -> Optional[str]:
-        """Get file contents at a commit."""
+        """
+        Make commit (and its parent) available in repo_dir, creating the
+        repo if needed. A cached clone that already has them isn't fetched.
+        
+        Args:
+            durable: False for throwaway (temp dir) repos, whose writes
+                     needn't be fsynced
+            deadline: time.monotonic() value by which to give up
+        
+        Returns:
+            None on success, else the error message
+        """
+        if not (repo_dir / ".git").exists():
+            repo_dir.parent.mkdir(parents=True, exist_ok=True)
+            # Set up beside the target and rename, so a cache entry is
+            # never seen half-initialized
+            staging_dir = repo_dir.with_name(f"{repo_dir.name}.tmp{os.getpid()}")
+            staging_dir.mkdir(parents=True, exist_ok=True)
+            self._run_cmd(["git", "init"], cwd=staging_dir, deadline=deadline)
+            self._run_cmd(["git", "remote", "add", "origin", repo_url], cwd=staging_dir, deadline=deadline)
+            try:
+                staging_dir.rename(repo_dir)
+            except OSError:
+                # Another process set it up first; use theirs
+                shutil.rmtree(staging_dir, ignore_errors=True)
+        elif self._has_commit(repo_dir, commit, deadline):
+            self._log(f"      Using cached clone {repo_dir.name}")
+            return None
+        
+        # Fetch just the commit we need, without blobs: git marks origin as
+        # a promisor, and only the blobs we read are fetched, on demand.
+        # Protocol v2 skips the full ref advertisement, --no-tags skips tag
+        # following, and auto-gc never runs mid-fetch.
+        config = ["-c", "protocol.version=2", "-c", "gc.auto=0"]
+        if not durable:
+            config += ["-c", "core.fsync=none"]
         stdout, stderr, code = self._run_cmd(
-            ["git", "show", f"{commit}:{file_path}"],
+            ["git", *config, "fetch", "--depth=2", "--no-tags", "--filter=blob:none", "origin", commit],
             cwd=repo_dir,
+            timeout=120,
+            deadline=deadline,
         )
-        return stdout if code == 0 else None
+        return stderr if code != 0 else None
     
-    def _get_file_before_commit(
-        self,
-        repo_dir: Path,
-        commit: str,
-        file_path: str,
-    ) -> Optional[str]:
-        """Get file contents before a commit."""
-        stdout, stderr, code = self._run_cmd(
-            ["git", "show", f"{commit}^:{file_path}"],
-            cwd=repo_dir,
+    def _has_commit(self, repo_dir: Path, commit: str, deadline: Optional[float] = None) -> bool:
+        """Check whether a commit and its parent exist locally."""
+        _, _, code = self._run_cmd(
+            ["git", "cat-file", "-e", f"{commit}^{{commit}}"], cwd=repo_dir, deadline=deadline,
+        )
+        if code != 0:
+            return False
+        _, _, code = self._run_cmd(
+            ["git", "rev-parse", "--verify", "--quiet", f"{commit}^"], cwd=repo_dir, deadline=deadline,
         )
-        return stdout if code == 0 else None
+        return code == 0
     
-    def _detect_language(self, file_path: str) -> str:
-        """Detect language from file extension."""
-        ext = Path(file_path).suffix.lower()
-        
-        lang_map = {
-            '.c': 'c',
-            '.h': 'c',
-            '.cpp': 'cpp',
-            '.cc': 'cpp',
-            '.cxx': 'cpp',
-            '.hpp': 'cpp',
-            '.java': 'java',
-            '.py': 'python',
-            '.js': 'javascript',
-            '.ts': 'typescript',
-            '.go': 'go',
-            '.rs': 'rust',
-            '.rb': 'ruby',
-        }
-        
-        return lang_map.get(ext, 'unknown')
+    def _log(self, message: str):
+        """Print one line, whole even when fetches run concurrently."""
+        with self._print_lock:
+            print(message)
     
-    def _count_categories(self, examples: List[CatastropheExample]) -> Dict[str, int]:
-        """Count examples by category."""
-        counts = {}
-        for ex in examples:
-            counts[ex.category] = counts.get(ex.category, 0) + 1
-        return counts
+    # Attempts per timed-out command, and the first retry's base pause
+    # (doubled for each later retry, with jitter)
+    CMD_ATTEMPTS = 3
+    CMD_BACKOFF = 1.0
     
-    def _count_field(self, examples: List[CatastropheExample], field: str) -> Dict[str, int]:
-        """Count examples by field value."""
-        counts = {}
-        for ex in examples:
-            value = getattr(ex, field, "unknown")
-            counts[value] = counts.get(value, 0) + 1
-        return counts
-
+    def _run_cmd(
+        self,
+        cmd: List[str],
+        cwd: Path,
+        timeout: int = 60,
+        deadline: Optional[float] = None,
+    ) -> Tuple[str, str, int]:
+        """
+        Run a command and return output.
+        
+        Every attempt gets the full timeout. A command that times out is
+        retried (up to CMD_ATTEMPTS in all) after an exponentially growing,
+        jittered pause. No attempt or pause runs past deadline (a
+        time.monotonic() value).
+        """
+        for attempt in range(self.CMD_ATTEMPTS):
+            if attempt:
+                pause = self.CMD_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                if deadline is not None and time.monotonic() + pause >= deadline:
+                    break
+                time.sleep(pause)
+            attempt_timeout = timeout
+            if deadline is not None:
+                attempt_timeout = min(attempt_timeout, deadline - time.monotonic())
+                if attempt_timeout <= 0:
+                    break
+            try:
+                result = subprocess.run(
+                    cmd,
+                    cwd=str(cwd),
+                    capture_output=True,
+                    text=True,
+                    timeout=attempt_timeout,
+                )
+                return result.stdout, result.stderr, result.returncode
+            except subprocess.TimeoutExpired:
+                continue
+            except Exception as e:
+                return "", str(e), 1
+        return "", "Timeout", 1
+    
+    def _detect_language(self, file_path: str) -> str:
+        """Detect language from file extension."""
+        # Same extension Path.suffix would give, without building a Path
+        name = file_path.rpartition('/')[2]
+        dot = name.rfind('.')
+        if dot <= 0:
+            return 'unknown'
+        return _LANG_MAP.get(name[dot:].lower(), 'unknown')
@@ -5,15 +5,28 @@ Prepares data for training the ArchIdx encoder.
 Converts catastrophe examples → ArchPackets → training features.
 """
 
+import os
 import sys
 import json
+import pickle
+import hashlib
+import functools
 import torch
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, FrozenSet, Tuple, Optional
 from dataclasses import dataclass
 from torch.utils.data import Dataset
 import numpy as np
 
+# ijson streams the examples (picking its C yajl2 backend when installed);
+# fall back to a full json.load when it isn't available.
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
 # Add ArchIdx to path
 ARCHIDX_PATH = Path(__file__).parent.parent.parent / "archidx" / "src"
 if not ARCHIDX_PATH.exists():
@@ -31,6 +44,28 @@ except ImportError:
     ARCHIDX_AVAILABLE = False
 
 
+# (sha1(code), language) -> invariant types detected in it, shared by every
+# dataset in the process (and optionally saved across runs)
+_INVARIANT_CACHE: Dict[Tuple[bytes, str], FrozenSet[str]] = {}
+
+# Languages the model embeds by index; anything else maps to 'other'
+LANGUAGES = ('c', 'cpp', 'java', 'python', 'javascript', 'typescript', 'go', 'rust', 'ruby', 'other')
+_LANG2ID = {lang: i for i, lang in enumerate(LANGUAGES)}
+
+# Other spellings of those languages seen in catastrophe records
+_LANG_ALIASES = {
+    'c++': 'cpp', 'cxx': 'cpp', 'c/c++': 'c',
+    'golang': 'go', 'js': 'javascript', 'ts': 'typescript', 'py': 'python',
+}
+
+
+def _language_id(language: str) -> int:
+    """Index of a language in LANGUAGES, after normalizing its name."""
+    name = (language or '').strip().lower()
+    name = _LANG_ALIASES.get(name, name)
+    return _LANG2ID.get(name, _LANG2ID['other'])
+
+
 @dataclass
 class TrainingExample:
     """A single training example."""
@@ -50,10 +85,10 @@ class TrainingExample:
     project: str
     
     # Computed features (filled during processing)
-    before_invariants: List[str] = None
-    after_invariants: List[str] = None
-    invariants_added: List[str] = None
-    invariants_removed: List[str] = None
+    before_invariants: FrozenSet[str] = None
+    after_invariants: FrozenSet[str] = None
+    invariants_added: FrozenSet[str] = None
+    invariants_removed: FrozenSet[str] = None
     
     def compute_severity(self) -> float:
         """Compute severity score from deaths/financial impact."""
@@ -68,6 +103,17 @@ class TrainingExample:
             return 0.4
 
 
+def _default_workers() -> int:
+    """
+    One detection process per CPU, split among the ranks on this host.
+    
+    Under torchrun every local rank builds its own dataset at the same
+    time, so each takes its share of the CPUs rather than all of them.
+    """
+    local_ranks = int(os.environ.get("LOCAL_WORLD_SIZE", 1))
+    return max(1, (os.cpu_count() or 1) // max(1, local_ranks))
+
+
 class DarkSeerDataset(Dataset):
     """
     PyTorch dataset for training ArchIdx encoder.
@@ -75,7 +121,7 @@ class DarkSeerDataset(Dataset):
     Features:
     - Invariant vectors (which invariants are present/missing)
     - Code complexity metrics
-    - Language encoding
+    - Language index (into LANGUAGES, for an embedding)
     
     Labels:
     - is_catastrophic (binary classification)
@@ -86,6 +132,9 @@ class DarkSeerDataset(Dataset):
         self,
         examples: List[TrainingExample],
         include_safe_examples: bool = True,
+        invariant_cache_path: Optional[Path] = None,
+        workers: Optional[int] = None,
+        drop_code: bool = False,
     ):
         """
         Initialize dataset.
@@ -93,18 +142,56 @@ class DarkSeerDataset(Dataset):
         Args:
             examples: List of training examples (catastrophes + safe changes)
             include_safe_examples: Whether to include safe changes as negatives
+            invariant_cache_path: Pickle file keeping detected invariants
+                                  across runs, keyed by code hash. Delete it
+                                  after upgrading ArchIdx.
+            workers: Processes for invariant detection (default: one per
+                     CPU, shared among the torchrun ranks on this host;
+                     1 detects in-process)
+            drop_code: Release each example's source code and invariant
+                       deltas (set to None) once the features are built.
+                       This modifies the caller's examples, so only pass
+                       True when they won't be used again (e.g. to build
+                       another dataset).
         """
         self.examples = examples
+        self.workers = workers or _default_workers()
         
         if not include_safe_examples:
             self.examples = [e for e in examples if e.is_catastrophic]
         
-        # Compute features for all examples
+        # Compute features for all examples (reusing earlier detections)
+        if invariant_cache_path is not None:
+            _load_invariant_cache(Path(invariant_cache_path))
         self._compute_features()
+        if invariant_cache_path is not None and ARCHIDX_AVAILABLE:
+            _save_invariant_cache(Path(invariant_cache_path))
         
         # Build vocabulary of invariants
         self.invariant_vocab = self._build_invariant_vocab()
         
+        # Features for every example, one row each (the 0/1 invariant
+        # block as a sparse CSR matrix, the complexity block as float32),
+        # the language of each as an index into LANGUAGES, and the labels
+        # as (N, 1) columns
+        (self.invariant_indptr, self.invariant_indices,
+         self.complexity_features) = self._build_features()
+        self.language_ids = np.array(
+            [_language_id(e.language) for e in self.examples],
+            dtype=np.int64,
+        )
+        self.is_catastrophic = np.array(
+            [1.0 if e.is_catastrophic else 0.0 for e in self.examples], dtype=np.float32,
+        ).reshape(-1, 1)
+        self.severity = np.array(
+            [e.severity_score for e in self.examples], dtype=np.float32,
+        ).reshape(-1, 1)
+        
+        if drop_code:
+            for e in self.examples:
+                e.before_code = e.after_code = None
+                e.invariants_added = e.invariants_removed = None
+        
         print(f"📊 Dataset: {len(self.examples)} examples")
         print(f"   Catastrophic: {sum(1 for e in self.examples if e.is_catastrophic)}")
         print(f"   Safe: {sum(1 for e in self.examples if not e.is_catastrophic)}")
@@ -114,61 +201,54 @@ class DarkSeerDataset(Dataset):
         return len(self.examples)
     
     def __getitem__(self, idx):
-        """Get a training example as tensors."""
-        example = self.examples[idx]
-        
-        # Convert to feature vector
-        features = self._example_to_features(example)
-        
-        # Labels
-        is_catastrophic = torch.tensor([1.0 if example.is_catastrophic else 0.0], dtype=torch.float32)
-        severity = torch.tensor([example.severity_score], dtype=torch.float32)
-        
+        """Get a training example as tensors (from the precomputed rows)."""
         return {
-            'features': features,
-            'is_catastrophic': is_catastrophic,
-            'severity': severity,
-            'example_id': example.example_id,
+            'features': self.get_features(idx),
+            'language_id': torch.tensor(self.language_ids[idx]),
+            'is_catastrophic': torch.from_numpy(self.is_catastrophic[idx]),
+            'severity': torch.from_numpy(self.severity[idx]),
+            'example_id': self.examples[idx].example_id,
         }
     
     def _compute_features(self):
-        """Compute features for all examples."""
+        """
+        Compute features for all examples.
+        
+        Each distinct snippet not already cached is parsed once; parsing
+        is CPU-bound, so the snippets are spread over worker processes.
+        """
         if not ARCHIDX_AVAILABLE:
             return
         
-        detector = ASTInvariantDetector()
+        # Snippets to detect: (code, language, name), one per cache key
+        pending = {}
+        for example in self.examples:
+            for code, side in ((example.before_code, "before"), (example.after_code, "after")):
+                key = _invariant_key(code, example.language)
+                if key not in _INVARIANT_CACHE and key not in pending:
+                    pending[key] = (code, example.language, f"{example.example_id}_{side}")
+        
+        if pending:
+            codes, languages, names = zip(*pending.values())
+            if self.workers > 1 and len(pending) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(pending))) as executor:
+                    results = list(executor.map(
+                        _detect_snippet_invariants, codes, languages, names, chunksize=16,
+                    ))
+            else:
+                results = list(map(_detect_snippet_invariants, codes, languages, names))
+            _INVARIANT_CACHE.update(zip(pending, results))
         
         for example in self.examples:
-            # Detect invariants in before/after code
-            before_invs = detector.detect_invariants(
-                example.before_code,
-                example.language,
-                f"{example.example_id}_before",
-            )
-            
-            after_invs = detector.detect_invariants(
-                example.after_code,
-                example.language,
-                f"{example.example_id}_after",
-            )
-            
-            # Also detect Phase 2 invariants
-            phase2_before = detect_phase2_invariants(example.before_code, example.language)
-            phase2_after = detect_phase2_invariants(example.after_code, example.language)
-            
-            # Extract invariant types
-            example.before_invariants = [i.invariant_type.value for i in before_invs]
-            example.before_invariants.extend([i['type'].value for i in phase2_before if 'type' in i])
-            
-            example.after_invariants = [i.invariant_type.value for i in after_invs]
-            example.after_invariants.extend([i['type'].value for i in phase2_after if 'type' in i])
+            # Invariants in before/after code (shared with the cache)
+            before_set = _INVARIANT_CACHE[_invariant_key(example.before_code, example.language)]
+            after_set = _INVARIANT_CACHE[_invariant_key(example.after_code, example.language)]
+            example.before_invariants = before_set
+            example.after_invariants = after_set
             
             # Compute delta
-            before_set = set(example.before_invariants)
-            after_set = set(example.after_invariants)
-            
-            example.invariants_added = list(after_set - before_set)
-            example.invariants_removed = list(before_set - after_set)
+            example.invariants_added = after_set - before_set
+            example.invariants_removed = before_set - after_set
     
     def _build_invariant_vocab(self) -> Dict[str, int]:
         """Build vocabulary of all invariant types seen."""
@@ -184,56 +264,64 @@ class DarkSeerDataset(Dataset):
         vocab = {inv: idx for idx, inv in enumerate(sorted(all_invariants))}
         return vocab
     
-    def _example_to_features(self, example: TrainingExample) -> torch.Tensor:
+    def get_features(self, idx: int) -> torch.Tensor:
+        """Dense float32 feature vector of example idx."""
+        features = np.zeros(self.get_feature_dim(), dtype=np.float32)
+        start, end = self.invariant_indptr[idx], self.invariant_indptr[idx + 1]
+        features[self.invariant_indices[start:end]] = 1.0
+        features[-3:] = self.complexity_features[idx]
+        return torch.from_numpy(features)
+    
+    def _build_features(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
         """
-        Convert example to feature vector.
+        Build the feature matrices, one row per example.
         
         Features:
         - Invariant presence vector (one-hot for each invariant type)
         - Invariant delta vector (which were added/removed)
         - Code complexity (number of lines, functions, etc.)
-        - Language encoding
-        """
-        features = []
         
-        # 1. Invariant presence (before)
-        inv_vector_before = self._invariants_to_vector(example.before_invariants or [])
-        features.extend(inv_vector_before)
+        The invariant columns (1-3) are only ever 0 or 1 and mostly 0, so
+        they are kept in CSR form: the columns set in row i are
+        indices[indptr[i]:indptr[i + 1]]. Complexity (4) is a float32
+        matrix of its own; get_features() puts a row back together. The
+        language is kept separately, as language_ids.
         
-        # 2. Invariant presence (after)
-        inv_vector_after = self._invariants_to_vector(example.after_invariants or [])
-        features.extend(inv_vector_after)
+        Returns:
+            (indptr, indices, complexity)
+        """
+        vocab = self.invariant_vocab
+        V = len(vocab)
+        complexity = np.zeros((len(self.examples), 3), dtype=np.float32)
         
-        # 3. Invariant delta
-        added_vector = self._invariants_to_vector(example.invariants_added or [])
-        removed_vector = self._invariants_to_vector(example.invariants_removed or [])
-        features.extend(added_vector)
-        features.extend(removed_vector)
+        # 1-3. Invariant presence (before, after) and delta (added,
+        # removed): blocks of V columns, collected row by row
+        rows, cols = [], []
+        for row, example in enumerate(self.examples):
+            for block, invariants in enumerate((
+                example.before_invariants,
+                example.after_invariants,
+                example.invariants_added,
+                example.invariants_removed,
+            )):
+                offset = block * V
+                for inv in invariants or ():
+                    idx = vocab.get(inv)
+                    if idx is not None:
+                        rows.append(row)
+                        cols.append(offset + idx)
+        indptr = np.zeros(len(self.examples) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.examples)), out=indptr[1:])
+        indices = np.array(cols, dtype=np.int32)
         
         # 4. Code complexity features
-        before_lines = len(example.before_code.split('\n'))
-        after_lines = len(example.after_code.split('\n'))
-        features.extend([
-            before_lines / 1000.0,  # Normalize
-            after_lines / 1000.0,
-            abs(after_lines - before_lines) / 1000.0,  # Size of change
-        ])
-        
-        # 5. Language encoding (one-hot)
-        languages = ['c', 'cpp', 'java', 'python', 'javascript', 'go', 'rust', 'other']
-        lang_vector = [1.0 if example.language.lower() in lang else 0.0 for lang in languages]
-        features.extend(lang_vector)
+        before_lines = np.array([e.before_code.count('\n') + 1 for e in self.examples], dtype=np.float32)
+        after_lines = np.array([e.after_code.count('\n') + 1 for e in self.examples], dtype=np.float32)
+        complexity[:, 0] = before_lines / 1000.0  # Normalize
+        complexity[:, 1] = after_lines / 1000.0
+        complexity[:, 2] = np.abs(after_lines - before_lines) / 1000.0  # Size of change
         
-        return torch.tensor(features, dtype=torch.float32)
-    
-    def _invariants_to_vector(self, invariants: List[str]) -> List[float]:
-        """Convert list of invariants to one-hot vector."""
-        vector = [0.0] * len(self.invariant_vocab)
-        for inv in invariants:
-            if inv in self.invariant_vocab:
-                idx = self.invariant_vocab[inv]
-                vector[idx] = 1.0
-        return vector
+        return indptr, indices, complexity
     
     def get_feature_dim(self) -> int:
         """Get dimensionality of feature vector."""
@@ -241,18 +329,76 @@ class DarkSeerDataset(Dataset):
         inv_dim = len(self.invariant_vocab) * 4
         # Code complexity
         complexity_dim = 3
-        # Language
-        lang_dim = 8
-        return inv_dim + complexity_dim + lang_dim
+        return inv_dim + complexity_dim
+    
+    def get_num_languages(self) -> int:
+        """Number of distinct language ids (size of the language embedding)."""
+        return len(LANGUAGES)
+
+
+def _invariant_key(code: str, language: str) -> Tuple[bytes, str]:
+    """_INVARIANT_CACHE key for a snippet."""
+    return hashlib.sha1(code.encode()).digest(), language
+
+
+@functools.lru_cache(maxsize=None)
+def _detector():
+    """One ASTInvariantDetector per process (worker processes build their own)."""
+    return ASTInvariantDetector()
+
+
+def _detect_snippet_invariants(code: str, language: str, name: str) -> FrozenSet[str]:
+    """
+    Invariant types in code, from both the AST and Phase 2 detectors.
+    
+    Module-level so it can run in a worker process.
+    """
+    invariants = {i.invariant_type.value for i in _detector().detect_invariants(code, language, name)}
+    invariants.update(
+        i['type'].value for i in detect_phase2_invariants(code, language) if 'type' in i
+    )
+    return frozenset(invariants)
+
+
+def _load_invariant_cache(path: Path):
+    """Merge a saved invariant cache into _INVARIANT_CACHE (if readable)."""
+    try:
+        with open(path, 'rb') as f:
+            cache = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return
+    # Caches written before invariants were frozensets hold lists
+    _INVARIANT_CACHE.update((key, frozenset(invs)) for key, invs in cache.items())
+
+
+def _save_invariant_cache(path: Path):
+    """Write _INVARIANT_CACHE to path (atomically, via a temp file)."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp{os.getpid()}")
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(_INVARIANT_CACHE, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _iter_examples(json_path: Path):
+    """Yield the entries of a dataset file's "examples" list one at a time."""
+    if IJSON_AVAILABLE:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'examples.item', use_float=True)
+    else:
+        with open(json_path) as f:
+            yield from json.load(f).get('examples', [])
 
 
 def load_catastrophes(json_path: Path) -> List[TrainingExample]:
-    """Load catastrophe examples from JSON."""
-    with open(json_path) as f:
-        data = json.load(f)
+    """
+    Load catastrophe examples from JSON.
     
+    The file is streamed when ijson is installed, so only one raw example
+    is held alongside the TrainingExamples built so far.
+    """
     examples = []
-    for ex_data in data.get('examples', []):
+    for ex_data in _iter_examples(json_path):
         # Compute severity score
         deaths = ex_data.get('deaths', 0)
         financial = ex_data.get('financial_loss_usd', 0)
@@ -6,24 +6,94 @@ without downloading entire repository history.
 
 Strategy:
 1. Use GitHub API to find child commits (git doesn't have "children")
-2. Use --filter=blob:none for blobless clone (metadata only)
-3. Use --deepen to get exactly N ancestors
+2. Use --filter=blob:none --no-checkout for blobless clone (metadata only)
+3. Fall back to shallow --depth fetches of exactly N ancestors
 4. Lazy-fetch blobs only on checkout
 
 This minimizes bandwidth and disk usage while getting exact commit windows.
 """
 
+import functools
 import os
 import json
+import hashlib
+import re
 import subprocess
 import tempfile
 import shutil
+import sqlite3
+import threading
+import time
+import weakref
+from itertools import islice
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from dataclasses import dataclass
-from typing import List, Optional, Tuple, Callable
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple, Callable, Union
 from urllib.parse import urlparse
 
+# requests keeps one HTTPS connection to the GitHub API across calls;
+# without it (or without a token) each call goes through the gh CLI
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
 from .types import CatastropheRecord, CommitWindow, TrainingExample
+from .component_aware_collector import BlobReader
+
+GITHUB_API = "https://api.github.com"
+
+
+# One full SHA per line, as rev-list prints them
+_SHA_RE = re.compile(rb'^[0-9a-f]{40}$', re.M)
+
+
+def _parse_shas(stdout: bytes) -> List[str]:
+    """SHAs from raw rev-list output; anything not SHA-shaped is dropped."""
+    return [sha.decode('ascii') for sha in _SHA_RE.findall(stdout)]
+
+
+# Config for every git command run by the fetcher. Work repos are
+# short-lived (or cached and gc'd between records, see
+# stream_catastrophe_windows), so auto-gc and object fsck during fetches
+# are wasted work; protocol v2 filters refs server-side and skipping
+# negotiation shortens the want/have exchange for deepening fetches.
+# Later -c flags win, so a command can still override any of these.
+_GIT_CONFIG = (
+    "-c", "gc.auto=0",
+    "-c", "fetch.fsckObjects=false",
+    "-c", "transfer.fsckObjects=false",
+    "-c", "receive.fsckObjects=false",
+    "-c", "protocol.version=2",
+    "-c", "fetch.negotiationAlgorithm=skipping",
+)
+
+
+def _share_equal_texts(
+    diffs: Dict[str, Tuple[str, str, List[str]]],
+) -> Dict[str, Tuple[str, str, List[str]]]:
+    """
+    Replace equal before/after contents in diffs with one shared string.
+    
+    Along a window, a commit's "before" is usually an earlier commit's
+    "after", byte for byte, but each was read (or loaded from the cache)
+    as its own copy. Examples built from the result then hold one copy
+    per distinct file version. Modifies and returns diffs.
+    """
+    texts = {}
+    for sha, (before, after, files) in diffs.items():
+        diffs[sha] = (texts.setdefault(before, before), texts.setdefault(after, after), files)
+    return diffs
+
+
+@functools.lru_cache(maxsize=1)
+def _git_version() -> str:
+    """Output of `git --version`, run once per process."""
+    result = subprocess.run(["git", "--version"], capture_output=True, text=True)
+    return result.stdout.strip()
 
 
 @dataclass
@@ -32,8 +102,117 @@ class FetchConfig:
     ancestors_count: int = 10  # N commits before target
     descendants_count: int = 10  # N commits after target
     use_sparse_checkout: bool = False  # Future optimization
-    github_token: Optional[str] = None  # For API calls
+    github_token: Optional[str] = None  # For API calls (default: $GITHUB_TOKEN / $GH_TOKEN)
     skip_verification_check: bool = False  # For verification scripts
+    repo_cache_dir: Optional[Path] = None  # Reuse clones across records (one per repo URL)
+    window_cache_path: Optional[Path] = None  # SQLite file memoizing windows and diffs across runs
+    fetch_workers: int = 8  # Windows of one record fetched concurrently
+
+
+class WindowCache:
+    """
+    SQLite memo of commit windows and commit diffs.
+    
+    Windows are keyed by (repo_url, target_sha, ancestors, descendants);
+    they cost a fetch, a rev-list and an API call to rebuild. Diffs are
+    keyed by commit SHA alone: a commit's content is fixed by its hash, so
+    the same commit in a fork shares the entry.
+    
+    Safe to share between threads (windows are fetched concurrently).
+    """
+    
+    def __init__(self, path: Path):
+        path = Path(path).expanduser()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS windows (
+                repo_url TEXT, target_sha TEXT, ancestors_n INT, descendants_n INT,
+                payload TEXT,
+                PRIMARY KEY (repo_url, target_sha, ancestors_n, descendants_n)
+            );
+            CREATE TABLE IF NOT EXISTS diffs (
+                sha TEXT PRIMARY KEY, files TEXT, before TEXT, after TEXT
+            );
+        """)
+    
+    def get_window(self, key: Tuple[str, str, int, int]) -> Optional[CommitWindow]:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT payload FROM windows WHERE repo_url=? AND target_sha=?"
+                " AND ancestors_n=? AND descendants_n=?", key
+            ).fetchone()
+        return CommitWindow(**json.loads(row[0])) if row else None
+    
+    def put_window(self, key: Tuple[str, str, int, int], window: CommitWindow):
+        payload = json.dumps({
+            'target_sha': window.target_sha,
+            'ancestors': window.ancestors,
+            'descendants': window.descendants,
+        })
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO windows VALUES (?, ?, ?, ?, ?)", (*key, payload))
+    
+    def get_diffs(self, shas: List[str]) -> Dict[str, Tuple[str, str, List[str]]]:
+        diffs = {}
+        with self.lock:
+            for sha in shas:
+                row = self.conn.execute(
+                    "SELECT files, before, after FROM diffs WHERE sha=?", (sha,)
+                ).fetchone()
+                if row:
+                    diffs[sha] = (row[1], row[2], json.loads(row[0]))
+        return diffs
+    
+    def put_diffs(self, diffs: Dict[str, Tuple[str, str, List[str]]]):
+        rows = [
+            (sha, json.dumps(files), before, after)
+            for sha, (before, after, files) in diffs.items()
+            # An empty result may just mean the objects weren't local (or
+            # a lazy blob fetch failed); don't make that permanent
+            if files and (before or after)
+        ]
+        with self.lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO diffs VALUES (?, ?, ?, ?)", rows)
+
+
+class CommitView:
+    """
+    Read-only view of one commit's files, without a checkout.
+    
+    Files are read through the repo's long-lived `git cat-file --batch`
+    process, so in a blobless clone only the blobs actually read are
+    fetched.
+    """
+    
+    def __init__(self, sha: str, repo_dir: Path, blobs: BlobReader):
+        self.sha = sha
+        self.repo_dir = repo_dir
+        self._blobs = blobs
+        self._files: Optional[List[str]] = None
+    
+    def read(self, path: str) -> str:
+        """Content of path at this commit ("" if absent or binary)."""
+        return self._blobs.read(f"{self.sha}:{path}")
+    
+    def read_many(self, paths: List[str]) -> List[str]:
+        """read() for several paths, in one round trip."""
+        return self._blobs.read_many([f"{self.sha}:{path}" for path in paths])
+    
+    def list_files(self) -> List[str]:
+        """Every file path in the commit's tree (listed once, then kept)."""
+        if self._files is None:
+            result = subprocess.run(
+                ["git", "ls-tree", "-r", "--name-only", "-z", self.sha],
+                cwd=str(self.repo_dir),
+                capture_output=True,
+            )
+            self._files = [
+                path.decode("utf-8", errors="replace")
+                for path in result.stdout.split(b"\0") if path
+            ] if result.returncode == 0 else []
+        return self._files
 
 
 class SurgicalFetcher:
@@ -51,16 +230,108 @@ class SurgicalFetcher:
     def __init__(self, config: FetchConfig = None):
         self.config = config or FetchConfig()
         self._check_git_version()
+        self.cache = WindowCache(self.config.window_cache_path) if self.config.window_cache_path else None
+        # One long-lived `git cat-file --batch` per repo, for get_commit_diff
+        self._blob_readers: Dict[Path, BlobReader] = {}
+        # One `git fetch` at a time into each repo: concurrent fetches
+        # would race on its shallow/ref lock files
+        self._fetch_locks = defaultdict(threading.Lock)
+        # GitHub API session (None: use the gh CLI)
+        self._github = self._github_session()
+        # (repo_url, target_sha, count) -> descendants, for lookups that
+        # succeeded (a target can be both breaking and fixing, or recur)
+        self._descendants: Dict[Tuple[str, str, int], List[str]] = {}
+        # Clean up when the fetcher is collected, or at exit, if close()
+        # wasn't called (unlike atexit.register, without keeping it alive)
+        weakref.finalize(self, self._close_resources, self._blob_readers, self._github)
+    
+    def close(self):
+        """Stop the cat-file processes and close the GitHub session."""
+        self._close_resources(self._blob_readers, self._github)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    @staticmethod
+    def _close_resources(blob_readers: Dict[Path, BlobReader], github):
+        for reader in blob_readers.values():
+            reader.close()
+        blob_readers.clear()
+        if github is not None:
+            github.close()
+    
+    def close_repo(self, repo_dir: Path):
+        """
+        Stop repo_dir's cat-file process, once the caller is done with it.
+        
+        For repos in a temporary work_dir; readers for work dirs that have
+        since been deleted are also dropped when the next record starts.
+        """
+        reader = self._blob_readers.pop(repo_dir, None)
+        if reader is not None:
+            reader.close()
+    
+    def _github_session(self):
+        """An authenticated requests.Session for the GitHub API, if possible."""
+        token = (
+            self.config.github_token
+            or os.environ.get("GITHUB_TOKEN")
+            or os.environ.get("GH_TOKEN")
+        )
+        if not (REQUESTS_AVAILABLE and token):
+            return None
+        session = requests.Session()
+        session.headers.update({
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+        })
+        return session
+    
+    def _github_get(self, api_path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        GET api_path from the GitHub API over the shared session.
+        
+        A rate-limited request is retried once if the limit resets within
+        a minute (per Retry-After / X-RateLimit-Reset).
+        
+        Returns:
+            The decoded JSON, or None on failure
+        """
+        for attempt in range(2):
+            response = self._github.get(f"{GITHUB_API}/{api_path}", params=params, timeout=30)
+            if response.status_code not in (403, 429):
+                return response.json() if response.ok else None
+            
+            if "Retry-After" in response.headers:
+                wait = float(response.headers["Retry-After"])
+            elif response.headers.get("X-RateLimit-Remaining") == "0":
+                wait = float(response.headers.get("X-RateLimit-Reset", 0)) - time.time()
+            else:
+                return None  # Forbidden, not rate-limited
+            if attempt or wait > 60:
+                print(f"      ⚠️ GitHub API rate limit hit (resets in {max(wait, 0):.0f}s)")
+                return None
+            time.sleep(max(wait, 0) + 1)
+        return None
+    
+    def _blob_reader(self, repo_dir: Path) -> BlobReader:
+        """The cat-file process for repo_dir, started on first use."""
+        reader = self._blob_readers.get(repo_dir)
+        if reader is None or reader.failed:
+            if reader is not None:
+                reader.close()
+            reader = self._blob_readers[repo_dir] = BlobReader(repo_dir)
+        return reader
     
     def _check_git_version(self):
         """Verify git version supports partial clone."""
         try:
-            result = subprocess.run(
-                ["git", "--version"],
-                capture_output=True, text=True
-            )
             # "git version 2.15.1" -> (2, 15)
-            version_str = result.stdout.strip().replace("git version ", "")
+            version_str = _git_version().replace("git version ", "")
             parts = version_str.split(".")[:2]
             version = tuple(int(p) for p in parts if p.isdigit())
             
@@ -90,6 +361,27 @@ class SurgicalFetcher:
         Returns:
             Tuple of (repo_dir, list of CommitWindows)
         """
+        repo_dir, windows = self.stream_catastrophe_windows(record, work_dir)
+        return repo_dir, list(windows)
+    
+    def stream_catastrophe_windows(
+        self,
+        record: CatastropheRecord,
+        work_dir: Optional[Path] = None,
+    ) -> Tuple[Path, Iterator[CommitWindow]]:
+        """
+        fetch_catastrophe_window, handing out each window as it's ready.
+        
+        The repo is set up (and the targets fetched) before this returns;
+        windows are then built in the background, up to fetch_workers
+        (at least one) ahead of the consumer, so a caller working through
+        window K overlaps with fetching K+1. Windows come out in order.
+        Closing the iterator early cancels the windows not yet started and
+        returns without waiting for those in flight.
+        
+        Returns:
+            Tuple of (repo_dir, iterator of CommitWindows)
+        """
         if not record.verified and not self.config.skip_verification_check:
             raise ValueError(f"CatastropheRecord {record.id} not verified!")
         
@@ -97,32 +389,195 @@ class SurgicalFetcher:
         if work_dir is None:
             work_dir = Path(tempfile.mkdtemp(prefix="darkseer_fetch_"))
         
-        repo_dir = work_dir / "repo"
-        repo_dir.mkdir(parents=True, exist_ok=True)
+        repo_dir = self._repo_dir(record.repo_url, work_dir)
+        repo_dir.parent.mkdir(parents=True, exist_ok=True)
         
-        # Initialize repo
-        self._run_git(["init"], repo_dir)
-        self._run_git(["remote", "add", "origin", record.repo_url], repo_dir)
+        # Earlier records' temporary repos are gone; so are their readers
+        for old_dir in [d for d in self._blob_readers if not d.exists()]:
+            self.close_repo(old_dir)
         
-        windows = []
+        # Blobless clone of the whole history: commits and trees only, blobs
+        # are fetched lazily from the promisor remote when read. Falls back
+        # to per-window shallow fetches if the clone fails. A repo left by
+        # an earlier call (same work_dir, or the shared cache) is reused;
+        # any commits it lacks are fetched per window below.
+        cached = self.config.repo_cache_dir is not None
+        if (repo_dir / ".git").exists():
+            shallow = (repo_dir / ".git" / "shallow").exists()
+            if cached:
+                # Fetches run with auto-gc off; tidy up between records
+                # instead (6700 loose objects is git's own default)
+                with self._fetch_locks[repo_dir]:
+                    self._run_git(["-c", "gc.auto=6700", "gc", "--auto", "--quiet"], repo_dir, timeout=600)
+        else:
+            shallow = not self._clone_partial(record.repo_url, repo_dir)
+            if shallow and not (repo_dir / ".git").exists():
+                repo_dir.mkdir(parents=True, exist_ok=True)
+                self._run_git(["init"], repo_dir)
+                self._run_git(["remote", "add", "origin", record.repo_url], repo_dir)
+            if cached:
+                # A cached clone is walked again by later runs: keep its
+                # commit-graph current so rev-list stays fast
+                self._run_git(["config", "fetch.writeCommitGraph", "true"], repo_dir)
+                self._run_git(["config", "gc.writeCommitGraph", "true"], repo_dir)
+        
+        # Windows around breaking commits, then fixing commits
+        targets = [(sha, "breaking") for sha in record.breaking_commits]
+        targets += [(sha, "fixing") for sha in record.fixing_commits]
+        
+        # Every target (and its ancestors) in as few fetches as possible
+        prefetched = self._prefetch_targets(
+            repo_dir, record.repo_url, [sha for sha, _ in targets], shallow
+        )
         
-        # Fetch windows around breaking commits
-        for sha in record.breaking_commits:
-            window = self._fetch_commit_window(
-                repo_dir, record.repo_url, sha, "breaking"
+        def fetch_window(target: Tuple[str, str]) -> Optional[CommitWindow]:
+            sha, window_type = target
+            return self._cached_commit_window(
+                repo_dir, record.repo_url, sha, window_type, shallow, sha in prefetched
             )
-            if window:
-                windows.append(window)
         
-        # Fetch windows around fixing commits
-        for sha in record.fixing_commits:
-            window = self._fetch_commit_window(
-                repo_dir, record.repo_url, sha, "fixing"
+        return repo_dir, self._iter_windows(fetch_window, targets)
+    
+    def _iter_windows(
+        self,
+        fetch_window: Callable[[Tuple[str, str]], Optional[CommitWindow]],
+        targets: List[Tuple[str, str]],
+    ) -> Iterator[CommitWindow]:
+        """
+        Yield fetch_window(target) for each target, in order, skipping
+        failures. Several windows are built concurrently: API calls and
+        rev-lists overlap, while fetches into the repo take turns (see
+        _git_fetch).
+        """
+        if not targets:
+            return
+        ahead = max(1, min(self.config.fetch_workers, len(targets)))
+        remaining = iter(targets)
+        executor = ThreadPoolExecutor(max_workers=ahead)
+        pending = deque(executor.submit(fetch_window, t) for t in islice(remaining, ahead))
+        try:
+            while pending:
+                window = pending.popleft().result()
+                for target in islice(remaining, 1):
+                    pending.append(executor.submit(fetch_window, target))
+                if window:
+                    yield window
+        finally:
+            # Closed early: drop the windows not yet started, and don't
+            # wait for the ones in flight (their results are unwanted)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _repo_dir(self, repo_url: str, work_dir: Path) -> Path:
+        """Where repo_url lives: the shared cache if configured, else work_dir."""
+        if self.config.repo_cache_dir is None:
+            return work_dir / "repo"
+        cache_dir = Path(self.config.repo_cache_dir).expanduser()
+        return cache_dir / hashlib.sha1(repo_url.encode()).hexdigest()
+    
+    def _clone_partial(self, repo_url: str, repo_dir: Path) -> bool:
+        """
+        Blobless, checkout-less clone of repo_url into repo_dir.
+        
+        Protocol v2 lets the server apply the blob filter on its side.
+        Clones beside repo_dir and renames, so a concurrent run sharing
+        the cache never sees a half-written clone.
+        """
+        print(f"   Cloning {repo_url} (blobless)...")
+        staging_dir = repo_dir.with_name(f"{repo_dir.name}.tmp{os.getpid()}")
+        _, stderr, code = self._run_git(
+            ["clone", "--filter=blob:none",
+             "--no-checkout", "--quiet", repo_url, str(staging_dir)],
+            repo_dir.parent,
+            timeout=600,
+        )
+        if code != 0:
+            print(f"      ⚠️ Blobless clone failed, using shallow fetches: {stderr[:100]}")
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            return False
+        try:
+            staging_dir.rename(repo_dir)
+        except OSError:
+            # Someone else finished the same clone first; use theirs
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return True
+    
+    def _has_commit(self, repo_dir: Path, sha: str) -> bool:
+        """True if sha (any revision, e.g. "abc~5") names a commit already in the local repo."""
+        _, _, code = self._run_git(["cat-file", "-e", f"{sha}^{{commit}}"], repo_dir)
+        return code == 0
+    
+    # Most SHAs sent in one `git fetch` (servers may cap the want-list)
+    PREFETCH_BATCH = 100
+    
+    def _prefetch_targets(
+        self,
+        repo_dir: Path,
+        repo_url: str,
+        target_shas: List[str],
+        shallow: bool = True,
+    ) -> Set[str]:
+        """
+        Fetch many window targets (with N ancestors) in one `git fetch`.
+        
+        Targets with a cached window, or (in a blobless clone) already
+        local, are left out. One bad SHA fails the whole fetch; those
+        batches are left to the per-window fetch.
+        
+        Returns:
+            The targets fetched here, whose windows needn't fetch them again
+        """
+        shas = list(dict.fromkeys(target_shas))
+        if self.cache is not None:
+            shas = [sha for sha in shas if self.cache.get_window(self._window_key(repo_url, sha)) is None]
+        if not shallow:
+            present = self._resolve_commits(repo_dir, shas)
+            shas = [sha for sha in shas if sha not in present]
+        if len(shas) < 2:
+            return set()
+        
+        depth = self.config.ancestors_count + 1 if shallow else None
+        fetched = set()
+        for i in range(0, len(shas), self.PREFETCH_BATCH):
+            batch = shas[i:i + self.PREFETCH_BATCH]
+            print(f"   Fetching {len(batch)} targets + {self.config.ancestors_count} ancestors...")
+            _, stderr, code = self._git_fetch(repo_dir, batch, depth)
+            if code == 0:
+                fetched.update(batch)
+            else:
+                print(f"      ⚠️ Batched fetch failed, fetching per window: {stderr[:100]}")
+        return fetched
+    
+    def _window_key(self, repo_url: str, target_sha: str) -> Tuple[str, str, int, int]:
+        """Window cache key for target_sha under the current config."""
+        return (repo_url, target_sha, self.config.ancestors_count, self.config.descendants_count)
+    
+    def _cached_commit_window(
+        self,
+        repo_dir: Path,
+        repo_url: str,
+        target_sha: str,
+        window_type: str,
+        shallow: bool = True,
+        prefetched: bool = False,
+    ) -> Optional[CommitWindow]:
+        """_fetch_commit_window, memoized in the window cache when configured."""
+        if self.cache is None:
+            return self._fetch_commit_window(
+                repo_dir, repo_url, target_sha, window_type, shallow, prefetched
             )
-            if window:
-                windows.append(window)
         
-        return repo_dir, windows
+        key = self._window_key(repo_url, target_sha)
+        window = self.cache.get_window(key)
+        if window is not None:
+            print(f"   Using cached {window_type} window for {target_sha[:8]}")
+            return window
+        
+        window = self._fetch_commit_window(
+            repo_dir, repo_url, target_sha, window_type, shallow, prefetched
+        )
+        if window is not None:
+            self.cache.put_window(key, window)
+        return window
     
     def _fetch_commit_window(
         self,
@@ -130,6 +585,8 @@ class SurgicalFetcher:
         repo_url: str,
         target_sha: str,
         window_type: str,
+        shallow: bool = True,
+        prefetched: bool = False,
     ) -> Optional[CommitWindow]:
         """
         Fetch a window of commits around a target.
@@ -138,6 +595,10 @@ class SurgicalFetcher:
         - Fetch target commit with enough depth to get N ancestors
         - Use rev-list to enumerate ancestors (works regardless of branch topology)
         - Optionally get descendants via API (GitHub compare)
+        
+        With a blobless clone (shallow=False) history is already local, so
+        only commits missing from it (e.g. off-branch) are fetched, unshallow.
+        prefetched means _prefetch_targets already fetched the target.
         """
         
         N = self.config.ancestors_count
@@ -147,39 +608,38 @@ class SurgicalFetcher:
         
         # 1. Fetch target commit with N+1 depth (target + N ancestors)
         # Using --filter=blob:none for blobless clone (fetch blobs on demand)
-        print(f"      Fetching target + {N} ancestors...")
-        stdout, stderr, code = self._run_git(
-            ["fetch", "--filter=blob:none", f"--depth={N + 1}", "origin", target_sha],
-            repo_dir
-        )
-        if code != 0:
-            print(f"      ❌ Fetch failed: {stderr[:100]}")
-            return None
+        # Skipped when an earlier window or record already brought the
+        # history in: a shallow repo needs target~N, a blobless clone
+        # just the target.
+        have = f"{target_sha}~{N}" if shallow else target_sha
+        if not prefetched and not self._has_commit(repo_dir, have):
+            print(f"      Fetching target + {N} ancestors...")
+            stdout, stderr, code = self._git_fetch(repo_dir, [target_sha], N + 1 if shallow else None)
+            if code != 0:
+                print(f"      ❌ Fetch failed: {stderr[:100]}")
+                return None
         
         # 2. Get ancestors using rev-list (works on any branch)
         # --reverse gives oldest-first order
         stdout, _, code = self._run_git(
             ["rev-list", target_sha, f"--max-count={N + 1}", "--reverse"],
-            repo_dir
+            repo_dir,
+            decode=False,
         )
         if code != 0:
             print(f"      ❌ rev-list failed")
             return None
             
-        all_commits = [c for c in stdout.strip().split('\n') if c]
+        all_commits = _parse_shas(stdout)
         
         # Split: ancestors are before target, target is last
-        if target_sha in all_commits:
-            target_idx = all_commits.index(target_sha)
-            ancestors = all_commits[:target_idx]
-        else:
-            # Target might be abbreviated, find by prefix
-            for i, c in enumerate(all_commits):
-                if c.startswith(target_sha) or target_sha.startswith(c):
-                    ancestors = all_commits[:i]
-                    break
-            else:
-                ancestors = all_commits[:-1] if all_commits else []
+        # (target might be abbreviated, so match by prefix)
+        target_idx = next(
+            (i for i, c in enumerate(all_commits)
+             if c.startswith(target_sha) or target_sha.startswith(c)),
+            -1,
+        )
+        ancestors = all_commits[:target_idx] if target_idx >= 0 else all_commits[:-1]
         
         # 3. Get descendants via API (optional - can fail gracefully)
         descendants = []
@@ -188,18 +648,16 @@ class SurgicalFetcher:
             if api_descendants:
                 # Fetch tip to get descendants
                 tip_sha = api_descendants[-1]
-                descendant_depth = len(api_descendants) + 10
-                print(f"      Fetching {len(api_descendants)} descendants (tip={tip_sha[:8]})...")
-                self._run_git(
-                    ["fetch", "--filter=blob:none", f"--depth={descendant_depth}", "origin", tip_sha],
-                    repo_dir
-                )
+                if shallow or not self._has_commit(repo_dir, tip_sha):
+                    print(f"      Fetching {len(api_descendants)} descendants (tip={tip_sha[:8]})...")
+                    self._git_fetch(repo_dir, [tip_sha], len(api_descendants) + 10 if shallow else None)
                 # Verify we can traverse from target to tip
                 stdout, _, _ = self._run_git(
                     ["rev-list", f"{target_sha}..{tip_sha}", "--reverse", f"--max-count={M}"],
-                    repo_dir
+                    repo_dir,
+                    decode=False,
                 )
-                descendants = [c for c in stdout.strip().split('\n') if c]
+                descendants = _parse_shas(stdout)
         
         print(f"      ✓ Window: {len(ancestors)} ancestors, {len(descendants)} descendants")
         
@@ -209,12 +667,37 @@ class SurgicalFetcher:
             descendants=descendants,
         )
     
+    def _git_fetch(self, repo_dir: Path, shas: List[str], depth: Optional[int] = None) -> Tuple[str, str, int]:
+        """
+        Blobless fetch of shas (shallow to depth, if given) into repo_dir.
+        
+        Fetches into one repo take turns, and auto-gc is off (_GIT_CONFIG)
+        so it can't start under a concurrent rev-list.
+        """
+        depth_args = [f"--depth={depth}"] if depth is not None else []
+        with self._fetch_locks[repo_dir]:
+            return self._run_git(
+                ["fetch", "--filter=blob:none", *depth_args, "origin", *shas],
+                repo_dir,
+            )
+    
     def _get_descendants(self, repo_url: str, target_sha: str, count: int) -> List[str]:
         """
         Get descendant commits using GitHub/GitLab API.
         
-        Falls back to empty list for non-supported hosts.
+        Falls back to empty list for non-supported hosts. Non-empty results
+        are remembered for the fetcher's lifetime.
         """
+        key = (repo_url, target_sha, count)
+        if key in self._descendants:
+            return self._descendants[key]
+        descendants = self._lookup_descendants(repo_url, target_sha, count)
+        if descendants:
+            self._descendants[key] = descendants
+        return descendants
+    
+    def _lookup_descendants(self, repo_url: str, target_sha: str, count: int) -> List[str]:
+        """Uncached body of _get_descendants."""
         # Parse repo URL to get owner/repo
         parsed = urlparse(repo_url)
         
@@ -236,17 +719,22 @@ class SurgicalFetcher:
         if path.endswith('.git'):
             path = path[:-4]
         
-        # Use gh CLI or curl
+        # Compare lists commits oldest first, so the first page of `count`
+        # is exactly what we keep; without per_page the API sends up to 250
+        # commits (and their files) per call.
+        api_path = f"repos/{path}/compare/{target_sha}...HEAD"
         try:
-            # Try gh CLI first
-            api_path = f"repos/{path}/compare/{target_sha}...HEAD"
-            result = subprocess.run(
-                ["gh", "api", api_path],
-                capture_output=True, text=True, timeout=30
-            )
+            if self._github is not None:
+                data = self._github_get(api_path, {"per_page": count})
+            else:
+                # No session: gh CLI (uses its own stored auth)
+                result = subprocess.run(
+                    ["gh", "api", f"{api_path}?per_page={count}"],
+                    capture_output=True, text=True, timeout=30
+                )
+                data = json.loads(result.stdout) if result.returncode == 0 else None
             
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
+            if data:
                 commits = data.get('commits', [])
                 return [c['sha'] for c in commits[:count]]
         except Exception as e:
@@ -266,30 +754,109 @@ class SurgicalFetcher:
         self,
         repo_dir: Path,
         window: CommitWindow,
-        callback: Callable[[str, Path], None],
+        callback: Callable[[str, CommitView], None],
     ):
         """
-        Iterate through commits in a window, checking out each.
+        Iterate through commits in a window, without checking any out.
         
-        Blobs are lazy-fetched on checkout (blobless clone magic).
+        The callback reads files through a CommitView, so the working tree
+        and index are never touched, and in a blobless clone only the
+        blobs it reads are fetched. A callback that reads the files each
+        commit changes can call prefetch_blobs(repo_dir, window.all_commits)
+        first, to fetch them in batches.
         
         Args:
             repo_dir: Repository directory
             window: CommitWindow to iterate
-            callback: Function to call for each commit (sha, repo_dir)
+            callback: Function to call for each commit (sha, CommitView)
         """
+        blobs = self._blob_reader(repo_dir)
         for sha in window.all_commits:
-            # Checkout triggers lazy blob fetch
-            stdout, stderr, code = self._run_git(
-                ["checkout", sha, "--quiet"],
-                repo_dir
-            )
-            
-            if code != 0:
-                print(f"      ⚠️ Checkout failed for {sha[:8]}: {stderr[:50]}")
+            callback(sha, CommitView(sha, repo_dir, blobs))
+    
+    # Most blob IDs passed to one prefetch `git fetch`
+    BLOB_FETCH_BATCH = 1000
+    
+    def prefetch_blobs(self, repo_dir: Path, commit_shas: Sequence[str]) -> int:
+        """
+        Fetch, in batches, the blobs of the files each commit changes.
+        
+        Both versions of each changed file are fetched: at the commit and
+        at its first parent. In a blobless clone, blobs are otherwise
+        fetched lazily as they're read, a request at a time, and the
+        commits' versions of a file never travel as deltas of each other.
+        (`git backfill` isn't used: it walks all of HEAD's history rather
+        than given commits, and fetches whole trees.)
+        
+        Returns:
+            Number of blobs requested
+        """
+        _, changes = self._log_changes(repo_dir, list(commit_shas))
+        return self._prefetch_changed_blobs(repo_dir, changes)
+    
+    def _prefetch_changed_blobs(
+        self,
+        repo_dir: Path,
+        changes: Dict[str, Tuple[Optional[str], List[str]]],
+    ) -> int:
+        """
+        prefetch_blobs for a _log_changes result (sha -> (parent, files)).
+        
+        Missing blobs are listed without fetching them (rev-list
+        --missing=print, with the tree walk limited to the changed paths),
+        then requested by ID the way git's own promisor fetch does.
+        
+        Returns:
+            Number of blobs requested
+        """
+        revs = {}
+        paths = {}
+        for sha, (parent, files) in changes.items():
+            if not files:
                 continue
-            
-            callback(sha, repo_dir)
+            revs[sha] = None
+            if parent:
+                revs[parent] = None
+            paths.update(dict.fromkeys(files))
+        if not paths:
+            return 0
+        
+        # Revs, then "--" and the paths, go in on stdin, so a long window
+        # can't hit the argv limit. --sparse keeps commits that don't touch
+        # the paths (e.g. a parent) from being dropped with their trees.
+        stdout, _, code = self._run_git(
+            ["--literal-pathspecs", "rev-list", "--objects", "--no-walk", "--sparse",
+             "--missing=print", "--stdin"],
+            repo_dir,
+            input="\n".join([*revs, "--", *paths]) + "\n",
+            decode=False,
+        )
+        if code != 0:
+            return 0
+        # Lines are "<oid> <path>" (paths in any encoding), "?<oid>" if missing
+        missing = [line[1:].decode('ascii') for line in stdout.splitlines() if line.startswith(b'?')]
+        if not missing:
+            return 0
+        
+        print(f"      Prefetching {len(missing)} blobs for {len(changes)} commits...")
+        for i in range(0, len(missing), self.BLOB_FETCH_BATCH):
+            with self._fetch_locks[repo_dir]:
+                self._run_git(
+                    ["-c", "fetch.negotiationAlgorithm=noop", "fetch",
+                     "--no-tags", "--recurse-submodules=no", "--filter=blob:none", "origin",
+                     *missing[i:i + self.BLOB_FETCH_BATCH]],
+                    repo_dir,
+                    timeout=600,
+                )
+        return len(missing)
+    
+    # Extensions treated as source when picking which changed file to diff
+    # (a tuple, for str.endswith)
+    SOURCE_EXTS = ('.c', '.cpp', '.h', '.java', '.py', '.js', '.ts', '.go', '.rs', '.rb')
+    
+    def _pick_target_file(self, files: List[str]) -> str:
+        """Pick the file to diff: the first source file, else the first file."""
+        return next((f for f in files if f.endswith(self.SOURCE_EXTS)), files[0])
     
     def get_commit_diff(
         self,
@@ -299,63 +866,231 @@ class SurgicalFetcher:
         """
         Get before/after code for a commit WITHOUT full checkout.
         
-        Uses git show to get file contents directly.
+        Lists the changed files with one `git diff-tree`, then reads both
+        versions of the target file through the repo's long-lived
+        `git cat-file --batch` process. Binary files read as "".
         
         Returns:
             Tuple of (before_code, after_code, changed_files)
         """
-        # Get changed files
+        if self.cache is not None:
+            cached = self.cache.get_diffs([commit_sha])
+            if commit_sha in cached:
+                return cached[commit_sha]
+        
+        # Get changed files (--cc lists a merge's files as `git show` does,
+        # --root a root commit's). -z leaves paths unquoted, so names with
+        # spaces, newlines or non-ASCII characters come through as-is.
         stdout, _, _ = self._run_git(
-            ["show", "--name-only", "--format=", commit_sha],
-            repo_dir
+            ["diff-tree", "--no-commit-id", "--name-only", "-r", "-z", "--cc", "--root", commit_sha],
+            repo_dir,
+            decode=False,
         )
-        files = [f.strip() for f in stdout.strip().split('\n') if f.strip()]
+        files = [f.decode("utf-8", errors="replace") for f in stdout.split(b"\0") if f]
         
         if not files:
             return "", "", []
         
         # Filter to source files
-        SOURCE_EXTS = {'.c', '.cpp', '.h', '.java', '.py', '.js', '.ts', '.go', '.rs', '.rb'}
-        source_files = [f for f in files if any(f.endswith(ext) for ext in SOURCE_EXTS)]
-        target = source_files[0] if source_files else files[0]
+        target = self._pick_target_file(files)
+        
+        # Before (from parent) and after (from commit), in one round trip
+        blobs = self._blob_reader(repo_dir)
+        before, after = blobs.read_many(
+            [f"{commit_sha}^:{target}", f"{commit_sha}:{target}"]
+        )
         
-        # Get parent
-        stdout, _, _ = self._run_git(["rev-parse", f"{commit_sha}^"], repo_dir)
-        parent = stdout.strip()
+        # A failed read (e.g. a lazy blob fetch) is returned, not cached
+        if self.cache is not None and not blobs.failed:
+            self.cache.put_diffs({commit_sha: (before, after, files)})
         
-        # Get before (from parent)
-        stdout, _, code = self._run_git(
-            ["show", f"{parent}:{target}"],
-            repo_dir
+        return before, after, files
+    
+    def batch_commit_diffs(
+        self,
+        repo_dir: Path,
+        commit_shas: List[str],
+    ) -> Dict[str, Tuple[str, str, List[str]]]:
+        """
+        Same as get_commit_diff, for many commits with one new git process.
+        
+        One `git log --stdin` lists every commit's parent and changed files,
+        then the repo's long-lived `git cat-file --batch` reads all
+        before/after blobs, instead of four git processes per commit.
+        
+        Returns:
+            Dict of requested sha -> (before_code, after_code, changed_files).
+            Commits that change no files map to ("", "", []); SHAs not in
+            the repo are absent.
+        """
+        if self.cache is None:
+            return _share_equal_texts(self._batch_commit_diffs(repo_dir, commit_shas)[0])
+        
+        diffs = self.cache.get_diffs(commit_shas)
+        missing = [sha for sha in commit_shas if sha not in diffs]
+        if missing:
+            fetched, complete = self._batch_commit_diffs(repo_dir, missing)
+            if complete:
+                self.cache.put_diffs(fetched)
+            diffs.update(fetched)
+        return _share_equal_texts(diffs)
+    
+    def _batch_commit_diffs(
+        self,
+        repo_dir: Path,
+        commit_shas: List[str],
+    ) -> Tuple[Dict[str, Tuple[str, str, List[str]]], bool]:
+        """
+        Uncached body of batch_commit_diffs.
+        
+        Returns:
+            (diffs, complete): complete is False if blob reading failed
+            part-way, so some contents may be wrongly empty
+        """
+        resolved, changes = self._log_changes(repo_dir, commit_shas)
+        if not changes:
+            return {}, True
+        
+        # Queue "<rev>:<path>" lookups for every commit that changed something
+        # (a commit's parent is often another requested commit: read once)
+        specs = {}
+        targets = {}
+        for sha, (parent, files) in changes.items():
+            if not files:
+                continue
+            target = self._pick_target_file(files)
+            targets[sha] = target
+            if parent:
+                specs[f"{parent}:{target}"] = None
+            specs[f"{sha}:{target}"] = None
+        specs = list(specs)
+        # In a blobless clone, fetch those blobs in batches before reading
+        self._prefetch_changed_blobs(
+            repo_dir, {sha: (changes[sha][0], [target]) for sha, target in targets.items()}
         )
-        before = stdout if code == 0 else ""
+        reader = self._blob_reader(repo_dir)
+        blobs = dict(zip(specs, reader.read_many(specs)))
+        
+        diffs = {}
+        for requested, sha in resolved.items():
+            parent, files = changes.get(sha, (None, []))
+            if not files:
+                diffs[requested] = ("", "", [])
+                continue
+            target = targets[sha]
+            before = blobs.get(f"{parent}:{target}", "") if parent else ""
+            after = blobs.get(f"{sha}:{target}", "")
+            diffs[requested] = (before, after, files)
+        
+        return diffs, not reader.failed
+    
+    def batch_changed_files(
+        self,
+        repo_dir: Path,
+        commit_shas: List[str],
+    ) -> Dict[str, List[str]]:
+        """
+        Changed files for many commits, from one `git log` and no blob reads.
+        
+        Cheap enough to score candidates before deciding whose contents to
+        fetch with batch_commit_diffs.
+        
+        Returns:
+            Dict of requested sha -> changed files (SHAs not in the repo
+            are absent).
+        """
+        resolved, changes = self._log_changes(repo_dir, commit_shas)
+        return {
+            requested: changes.get(sha, (None, []))[1]
+            for requested, sha in resolved.items()
+        }
+    
+    def _log_changes(
+        self,
+        repo_dir: Path,
+        commit_shas: List[str],
+    ) -> Tuple[Dict[str, str], Dict[str, Tuple[Optional[str], List[str]]]]:
+        """
+        Parent and changed files for each commit, via one `git log --stdin`.
+        
+        Returns:
+            (requested sha -> full sha, full sha -> (first parent, files))
+        """
+        # Resolve to full SHAs up front: one unknown revision would make the
+        # whole `git log --stdin` fail, and callers may pass abbreviations
+        resolved = self._resolve_commits(repo_dir, commit_shas)
+        if not resolved:
+            return {}, {}
         
-        # Get after (from commit)
+        # \x01 marks each commit header so empty file lists stay unambiguous
         stdout, _, code = self._run_git(
-            ["show", f"{commit_sha}:{target}"],
-            repo_dir
+            ["log", "--no-walk=unsorted", "--stdin", "-z", "--cc",
+             "--name-only", "--format=%x01%H %P"],
+            repo_dir,
+            input="\n".join(dict.fromkeys(resolved.values())) + "\n",
         )
-        after = stdout if code == 0 else ""
+        if code != 0:
+            return {}, {}
         
-        return before, after, files
+        changes = {}  # sha -> (first parent, files)
+        sha = None
+        for token in stdout.split('\0'):
+            token = token.strip('\n')
+            if token.startswith('\x01'):
+                sha, *parents = token[1:].split()
+                changes[sha] = (parents[0] if parents else None, [])
+            elif token and sha:
+                changes[sha][1].append(token)
+        
+        return resolved, changes
+    
+    def _resolve_commits(self, repo_dir: Path, revs: List[str]) -> Dict[str, str]:
+        """Map each rev that names a commit to its full SHA, in one process."""
+        stdout, _, code = self._run_git(
+            ["cat-file", "--batch-check=%(objectname)"],
+            repo_dir,
+            input="".join(f"{rev}^{{commit}}\n" for rev in revs),
+            decode=False,
+        )
+        if code != 0:
+            return {}
+        resolved = {}
+        # Unknown revs come back as "<rev>^{commit} missing"
+        for rev, line in zip(revs, stdout.splitlines()):
+            if b' ' not in line:
+                resolved[rev] = line.decode('ascii')
+        return resolved
     
     def _run_git(
-        self, args: List[str], cwd: Path, timeout: int = 120
-    ) -> Tuple[str, str, int]:
-        """Run a git command."""
+        self,
+        args: List[str],
+        cwd: Path,
+        timeout: int = 120,
+        input: Optional[str] = None,
+        decode: bool = True,
+    ) -> Tuple[Union[str, bytes], str, int]:
+        """
+        Run a git command (with _GIT_CONFIG), optionally feeding it stdin.
+        
+        With decode=False stdout is returned as raw bytes, skipping the
+        UTF-8 decode of the whole output: for SHA listings (decoded as
+        ASCII by the caller) and output with paths in unknown encodings.
+        """
+        empty = "" if decode else b""
         try:
             result = subprocess.run(
-                ["git"] + args,
+                ["git", *_GIT_CONFIG, *args],
                 cwd=str(cwd),
+                input=input.encode() if input is not None else None,
                 capture_output=True,
-                text=True,
                 timeout=timeout,
             )
-            return result.stdout, result.stderr, result.returncode
+            stdout = result.stdout.decode() if decode else result.stdout
+            return stdout, result.stderr.decode(errors="replace"), result.returncode
         except subprocess.TimeoutExpired:
-            return "", "timeout", 1
+            return empty, "timeout", 1
         except Exception as e:
-            return "", str(e), 1
+            return empty, str(e), 1
 
 
 # Verified catastrophe records (commit hashes confirmed)
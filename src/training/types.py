@@ -2,10 +2,31 @@
 Training data types for DarkSeer.
 """
 
-from dataclasses import dataclass, field
-from typing import List, Optional
+import json
+import sys
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from typing import List, Optional, Tuple
 from enum import Enum
 
+# Optional fast JSON: ijson streams records, orjson parses whole files
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Records, windows and examples are created in bulk (one example per
+# commit), so they're slotted where dataclasses support it (3.10+):
+# no per-instance __dict__, and faster attribute access.
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
 
 class CatastropheType(Enum):
     """Type of catastrophe for training purposes."""
@@ -15,7 +36,7 @@ class CatastropheType(Enum):
     SUPPLY_CHAIN = "supply_chain"  # Malicious code injection (e.g., xz backdoor)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class CatastropheRecord:
     """
     A catastrophe with verified git information.
@@ -50,26 +71,69 @@ class CatastropheRecord:
     year: int = 2020
     description: str = ""
     verified: bool = False  # Set True only after commit hashes confirmed
+    
+    @classmethod
+    def from_dict(cls, data: dict) -> "CatastropheRecord":
+        """Build a record from a JSON entry, ignoring keys it doesn't know."""
+        kwargs = {k: v for k, v in data.items() if k in _RECORD_FIELDS}
+        kwargs["catastrophe_type"] = CatastropheType(data.get("catastrophe_type", "sudden"))
+        return cls(**kwargs)
+    
+    @classmethod
+    def load_verified(cls, json_path: Path) -> List["CatastropheRecord"]:
+        """
+        Load the verified records from a verified_catastrophes.json file.
+        
+        Entries without `verified: true` are skipped.
+        """
+        return [
+            cls.from_dict(entry)
+            for entry in _iter_catastrophe_entries(Path(json_path))
+            if entry.get("verified")
+        ]
+
 
+# Field names accepted by CatastropheRecord.from_dict
+_RECORD_FIELDS = frozenset(f.name for f in fields(CatastropheRecord))
 
-@dataclass 
+
+def _iter_catastrophe_entries(json_path: Path):
+    """Yield entries of the top-level `catastrophes` array."""
+    if IJSON_AVAILABLE:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'catastrophes.item', use_float=True)
+    elif ORJSON_AVAILABLE:
+        yield from orjson.loads(json_path.read_bytes()).get("catastrophes", [])
+    else:
+        with open(json_path) as f:
+            yield from json.load(f).get("catastrophes", [])
+
+
+@dataclass(frozen=True, **_SLOTS)
 class CommitWindow:
     """
     A window of commits around a target for training.
     
-    Used to collect context around breaking/fixing commits.
+    Used to collect context around breaking/fixing commits. Immutable (and
+    hashable): the commit lists are stored as tuples.
     """
     target_sha: str
-    ancestors: List[str] = field(default_factory=list)   # N commits before
-    descendants: List[str] = field(default_factory=list)  # N commits after
+    ancestors: Tuple[str, ...] = ()   # N commits before
+    descendants: Tuple[str, ...] = ()  # N commits after
+    
+    def __post_init__(self):
+        # Accept any sequence (e.g. the lists rev-list parsing produces)
+        object.__setattr__(self, "ancestors", tuple(self.ancestors))
+        object.__setattr__(self, "descendants", tuple(self.descendants))
     
     @property
-    def all_commits(self) -> List[str]:
+    def all_commits(self) -> Tuple[str, ...]:
         """All commits in chronological order (oldest first)."""
-        return self.ancestors + [self.target_sha] + self.descendants
+        # Not a field, so asdict()/fields() round-trip through __init__
+        return (*self.ancestors, self.target_sha, *self.descendants)
 
 
-@dataclass
+@dataclass(**_SLOTS)
 class TrainingExample:
     """
     A single training example (catastrophic or safe).
@@ -89,4 +153,23 @@ class TrainingExample:
     # Context
     category: str = "unknown"  # BREAKING, FIXING, SAFE_BEFORE, SAFE_AFTER, etc.
     component_overlap: float = 0.0  # For component-aware sampling
+    
+    def to_dict(self) -> dict:
+        """
+        Plain-dict form for serialization.
+        
+        Equivalent to dataclasses.asdict, without its recursive deep copy
+        of every field (notably the multi-KB before/after code strings).
+        """
+        return {
+            "commit_sha": self.commit_sha,
+            "repo_url": self.repo_url,
+            "before_code": self.before_code,
+            "after_code": self.after_code,
+            "changed_files": self.changed_files,
+            "is_catastrophic": self.is_catastrophic,
+            "catastrophe_id": self.catastrophe_id,
+            "category": self.category,
+            "component_overlap": self.component_overlap,
+        }
 